@@ -3,7 +3,7 @@ from geopandas.geodataframe import GeoDataFrame
 
 from geopandas.io.file import read_file
 from geopandas.io.sql import read_postgis
-from geopandas.tools import sjoin
+from geopandas.tools import sjoin, sjoin_nearest
 from geopandas.tools import overlay
 
 import geopandas.datasets
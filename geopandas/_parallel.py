@@ -0,0 +1,51 @@
+"""
+Running tasks concurrently for the ``n_jobs`` and ``executor`` keywords.
+
+The tasks are run with ``executor`` if given (any object with a ``map``
+method, e.g. a ``concurrent.futures`` executor or a ``multiprocessing``
+pool), otherwise with a thread pool of ``n_jobs`` threads (GEOS and PROJ
+release the GIL). The results are always returned in the order of the
+tasks, so that they do not depend on the order in which the tasks
+complete.
+"""
+from itertools import islice
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+
+def _n_jobs(n_jobs):
+    """Check ``n_jobs``, -1 standing for the number of CPUs."""
+    if n_jobs == -1:
+        return cpu_count()
+    if n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer or -1")
+    return n_jobs
+
+
+def _map(func, tasks, n_jobs, executor=None):
+    """
+    Results of ``func`` on each of ``tasks``, in order.
+
+    At most ``2 * n_jobs`` tasks are submitted at a time, so a lazy iterable
+    of tasks is never built up front. Without ``executor`` and with a single
+    job, the tasks are run serially.
+    """
+    pool = None
+    if executor is not None:
+        map_tasks = executor.map
+    elif n_jobs > 1:
+        pool = ThreadPool(n_jobs)
+        map_tasks = pool.map
+    else:
+        map_tasks = map
+    tasks = iter(tasks)
+    try:
+        while True:
+            window = list(islice(tasks, 2 * n_jobs))
+            if not window:
+                break
+            for result in map_tasks(func, window):
+                yield result
+    finally:
+        if pool is not None:
+            pool.close()
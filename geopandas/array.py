@@ -0,0 +1,727 @@
+"""
+Array-based storage and operations for geometries.
+
+The ``GeometryArray`` wraps a one-dimensional numpy object array of shapely
+geometries (or ``None`` for missing values). The functions in this module
+operate on whole arrays at once and return numpy arrays or new
+``GeometryArray`` objects, so that ``GeoSeries`` and ``GeoDataFrame`` only
+have to deal with re-attaching the index and crs to the results.
+"""
+import numbers
+import struct
+
+import numpy as np
+from shapely.geometry import LinearRing
+from shapely.geometry.base import BaseGeometry
+from shapely.geos import WKBReader, WKBWriter, lgeos
+from shapely.prepared import prep
+
+
+class GeometryArray(object):
+    """
+    Class wrapping a numpy array of Shapely objects.
+
+    It follows the pandas ExtensionArray interface (``take``, ``isna``,
+    ``copy``, ``_from_sequence``, ``_concat_same_type``, ``nbytes``), so it
+    can be used as the backing store of a ``GeoSeries``.
+
+    Parameters
+    ----------
+    data : GeometryArray or numpy.ndarray of object dtype
+        One-dimensional array holding shapely geometries or None. The array
+        is not copied.
+    """
+
+    def __init__(self, data):
+        if isinstance(data, self.__class__):
+            data = data.data
+        elif not isinstance(data, np.ndarray):
+            raise TypeError(
+                "'data' should be array of geometry objects. Use from_shapely "
+                "to construct a GeometryArray.")
+        elif not data.ndim == 1:
+            raise ValueError(
+                "'data' should be a 1-dimensional array of geometry objects.")
+        self.data = data
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def ndim(self):
+        return 1
+
+    @property
+    def size(self):
+        return self.data.size
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __array__(self, dtype=None):
+        return self.data
+
+    def __getitem__(self, idx):
+        if isinstance(idx, numbers.Integral):
+            return self.data[idx]
+        elif isinstance(idx, (slice, list, np.ndarray)):
+            return GeometryArray(self.data[idx])
+        else:
+            raise TypeError("Index type not supported", idx)
+
+    def __setitem__(self, key, value):
+        if isinstance(value, GeometryArray):
+            value = value.data
+        elif isinstance(value, BaseGeometry) or value is None:
+            pass
+        else:
+            value = from_shapely(value).data
+        self.data[key] = value
+
+    def __repr__(self):
+        return "<GeometryArray of length {0}>".format(len(self))
+
+    @classmethod
+    def _from_sequence(cls, scalars, copy=False):
+        """Construct a new GeometryArray from a sequence of geometries."""
+        return from_shapely(scalars)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        """Concatenate multiple GeometryArrays into a single one."""
+        data = np.concatenate([ga.data for ga in to_concat])
+        return GeometryArray(data)
+
+    def copy(self):
+        return GeometryArray(self.data.copy())
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        """
+        Take elements from the array by position.
+
+        Parameters
+        ----------
+        indices : sequence of integers
+            Positions of the elements to take.
+        allow_fill : bool, default False
+            If True, -1 in ``indices`` indicates a missing value that is
+            filled with ``fill_value``.
+        fill_value : geometry or None, default None
+            Value used for missing positions when ``allow_fill`` is True.
+        """
+        indices = np.asarray(indices, dtype='int64')
+        if allow_fill:
+            mask = indices == -1
+            if (indices < -1).any():
+                raise ValueError("Invalid value in 'indices'. Must be all "
+                                 ">= -1 for allow_fill=True")
+            if not len(self):
+                # only missing positions can be taken from an empty array
+                if not mask.all():
+                    raise IndexError("cannot do a non-empty take from an "
+                                     "empty array")
+                result = np.empty(len(indices), dtype=object)
+                result.fill(fill_value)
+            else:
+                result = self.data.take(np.where(mask, 0, indices))
+                result[mask] = fill_value
+        else:
+            result = self.data.take(indices)
+        return GeometryArray(result)
+
+    def isna(self):
+        """
+        Boolean numpy array indicating the missing values (anything that is
+        not a geometry, such as None or NaN).
+        """
+        return _isna(self.data)
+
+    @property
+    def bounds(self):
+        """
+        Float array of shape ``(n, 4)`` with the ``minx, miny, maxx, maxy``
+        bounds of each geometry. Missing and empty geometries get NaN.
+        """
+        # the envelopes keep the cost per geometry independent of the
+        # number of vertices
+        return _CoordinateBuffer(_unary_geo('envelope', self)).bounds()
+
+    @property
+    def total_bounds(self):
+        """
+        Float array with the ``minx, miny, maxx, maxy`` bounds of the array
+        as a whole (NaN if there are no non-empty geometries).
+        """
+        return _total_bounds(self.bounds)
+
+
+_NAN_BOUNDS = (np.nan, np.nan, np.nan, np.nan)
+
+
+def _total_bounds(bounds):
+    """Combine an ``(n, 4)`` bounds array into the total bounds."""
+    valid = ~np.isnan(bounds[:, 0])
+    if not valid.any():
+        return np.array(_NAN_BOUNDS)
+    bounds = bounds[valid]
+    return np.array((bounds[:, 0].min(), bounds[:, 1].min(),
+                     bounds[:, 2].max(), bounds[:, 3].max()))
+
+
+def _bbox_candidates(op, bounds, other_bounds):
+    """
+    Boolean mask of the rows of ``bounds`` (an ``(n, 4)`` array) for which
+    the predicate ``op`` with a geometry with bounds ``other_bounds`` can
+    be True, based on the bounding boxes only. Rows with NaN bounds are
+    never candidates.
+
+    Returns None for predicates that cannot be decided from the bounding
+    boxes.
+    """
+    if op not in _BBOX_PREDICATES:
+        return None
+    minx, miny, maxx, maxy = other_bounds
+    with np.errstate(invalid='ignore'):
+        if op == 'contains':
+            return ((bounds[:, 0] <= minx) & (bounds[:, 1] <= miny) &
+                    (bounds[:, 2] >= maxx) & (bounds[:, 3] >= maxy))
+        elif op == 'within':
+            return ((bounds[:, 0] >= minx) & (bounds[:, 1] >= miny) &
+                    (bounds[:, 2] <= maxx) & (bounds[:, 3] <= maxy))
+        else:
+            return ((bounds[:, 0] <= maxx) & (bounds[:, 1] <= maxy) &
+                    (bounds[:, 2] >= minx) & (bounds[:, 3] >= miny))
+
+
+# predicates that are False for geometries with non-overlapping bounding
+# boxes (and for contains/within, without box containment)
+_BBOX_PREDICATES = ('intersects', 'touches', 'overlaps', 'crosses',
+                    'contains', 'within', 'equals')
+
+
+def from_shapely(data):
+    """
+    Convert a list or array of shapely objects to a GeometryArray.
+
+    Missing values (None or NaN) are stored as None. Any other non-geometry
+    value raises a TypeError.
+    """
+    if isinstance(data, GeometryArray):
+        return data
+    n = len(data)
+    out = np.empty(n, dtype=object)
+    # assign element-wise so that multi-part geometries, which implement the
+    # sequence protocol, are not unpacked by numpy
+    for i, geom in enumerate(data):
+        if isinstance(geom, BaseGeometry):
+            out[i] = geom
+        elif geom is None or (isinstance(geom, float) and np.isnan(geom)):
+            out[i] = None
+        else:
+            raise TypeError("Input must be valid geometry objects: "
+                            "{0}".format(geom))
+    return GeometryArray(out)
+
+
+#
+# Unary operations
+#
+
+def _unary_op(op, left, null_value=False, dtype=None):
+    """
+    Unary operation that returns a numpy array. The dtype of the result
+    is derived from the type of ``null_value``, unless given.
+    """
+    dtype = np.dtype(type(null_value) if dtype is None else dtype)
+    if dtype == object:
+        # assign element-wise to keep sequence-like results (e.g. interiors)
+        # as scalars
+        out = np.empty(len(left), dtype=object)
+        for i, geom in enumerate(left.data):
+            out[i] = getattr(geom, op, null_value)
+        return out
+    data = [getattr(geom, op, null_value) for geom in left.data]
+    return np.array(data, dtype=dtype)
+
+
+def _unary_geo(op, left, *args, **kwargs):
+    """
+    Unary operation that returns a GeometryArray. ``op`` can be either a
+    property or a method of the geometries; for methods the additional
+    arguments are passed through.
+    """
+    # missing values (None or NaN) stay None
+    out = np.empty(len(left), dtype=object)
+    for i in np.flatnonzero(~_isna(left.data)):
+        val = getattr(left.data[i], op)
+        out[i] = val(*args, **kwargs) if callable(val) else val
+    return GeometryArray(out)
+
+
+def _unary_geo_per_row(op, left, values, *args, **kwargs):
+    """
+    Unary operation that returns a GeometryArray, calling the method ``op``
+    of each geometry with the matching element of ``values`` (e.g. a buffer
+    distance per row) as first argument.
+    """
+    values = np.asarray(values)
+    if values.ndim != 1 or len(values) != len(left):
+        raise ValueError("Length of values ({0}) does not match the length "
+                         "of the geometries ({1})".format(len(values),
+                                                          len(left)))
+    out = np.empty(len(left), dtype=object)
+    for i in np.flatnonzero(~_isna(left.data)):
+        out[i] = getattr(left.data[i], op)(values[i], *args, **kwargs)
+    return GeometryArray(out)
+
+
+#
+# Binary operations
+#
+
+def _isna(data):
+    """Boolean array flagging the missing values (not a geometry)."""
+    return np.array([not isinstance(geom, BaseGeometry) for geom in data],
+                    dtype=bool)
+
+
+def _null_or_empty(data):
+    """Boolean array flagging the missing or empty geometries in ``data``."""
+    return np.array([not isinstance(geom, BaseGeometry) or geom.is_empty
+                     for geom in data], dtype=bool)
+
+
+def _check_lengths(left, right):
+    if len(left) != len(right):
+        raise ValueError("Lengths of inputs do not match. Left: {0}, "
+                         "Right: {1}".format(len(left), len(right)))
+
+
+def _binary_method(op, left, right, dtype, null_value, mask_func,
+                   *args, **kwargs):
+    """
+    Evaluate the binary method ``op`` for all pairs of ``left`` and
+    ``right`` that are not flagged by ``mask_func``, and return the results
+    as a numpy array with ``null_value`` at the other positions.
+
+    The masks are computed once for the whole array and the method is
+    resolved once on the base class, so the loop only performs the GEOS
+    calls themselves.
+    """
+    func = getattr(BaseGeometry, op)
+    result = np.empty(len(left), dtype=dtype)
+    result.fill(null_value)
+
+    if isinstance(right, GeometryArray):
+        _check_lengths(left, right)
+        idx = np.flatnonzero(~(mask_func(left.data) | mask_func(right.data)))
+        values = (func(this_elem, other_elem, *args, **kwargs)
+                  for this_elem, other_elem in zip(left.data[idx],
+                                                   right.data[idx]))
+    else:
+        if mask_func([right])[0]:
+            return result
+        idx = np.flatnonzero(~mask_func(left.data))
+        values = (func(geom, right, *args, **kwargs)
+                  for geom in left.data[idx])
+
+    result[idx] = np.fromiter(values, dtype=dtype, count=len(idx))
+    return result
+
+
+# predicates for which GEOS can return True when one of the geometries is
+# empty (all others are False for empty input)
+_EMPTY_TRUE_PREDICATES = ('disjoint', 'equals', 'equals_exact',
+                          'almost_equals')
+
+
+# predicates that can be evaluated against a single geometry by preparing
+# that geometry, mapped to the (inverse) predicate of the prepared geometry
+_PREPARED_PREDICATES = {
+    'intersects': 'intersects',
+    'disjoint': 'disjoint',
+    'touches': 'touches',
+    'overlaps': 'overlaps',
+    'contains': 'within',
+    'within': 'contains',
+}
+
+
+def _prepared_predicate(op, left, right):
+    """
+    Evaluate the predicate ``op`` between all geometries of ``left`` and
+    the single geometry ``right``.
+
+    ``right`` is prepared once, so that GEOS can reuse its indexed
+    segments for every row instead of walking all its vertices for each
+    comparison (e.g. points in a detailed boundary).
+    """
+    func = getattr(prep(right), _PREPARED_PREDICATES[op])
+    result = np.zeros(len(left), dtype=bool)
+    idx = np.flatnonzero(~_isna(left.data))
+    result[idx] = np.fromiter((func(geom) for geom in left.data[idx]),
+                              dtype=bool, count=len(idx))
+    return result
+
+
+def _binary_predicate(op, left, right, *args, **kwargs):
+    """
+    Binary predicate that returns a boolean numpy array.
+
+    ``right`` can be a GeometryArray of the same length as ``left``
+    (element-wise operation) or a single geometry. Pairs involving an empty
+    or missing geometry evaluate to False.
+    """
+    # Only the missing values are filtered up front: GEOS evaluates the
+    # predicates on empty geometries to False, so the (costly) emptiness
+    # check is only needed to correct the True results of the few
+    # predicates that can hold for empty geometries.
+    if (op in _PREPARED_PREDICATES and not args and not kwargs
+            and isinstance(right, BaseGeometry) and not right.is_empty):
+        result = _prepared_predicate(op, left, right)
+    else:
+        result = _binary_method(op, left, right, bool, False, _isna,
+                                *args, **kwargs)
+    if op in _EMPTY_TRUE_PREDICATES:
+        idx = np.flatnonzero(result)
+        empty = _null_or_empty(left.data[idx])
+        if isinstance(right, GeometryArray):
+            empty |= _null_or_empty(right.data[idx])
+        # a single empty ``right`` geometry is left to GEOS (e.g. every
+        # non-empty geometry is disjoint from it), as before
+        result[idx[empty]] = False
+    return result
+
+
+def _predicate_pairs(op, left, right, left_idx, right_idx):
+    """
+    Evaluate the predicate ``op`` for the pairs of geometries
+    ``left[left_idx[k]]`` and ``right[right_idx[k]]`` (e.g. the candidate
+    pairs found with a spatial index), returning a boolean numpy array.
+
+    The pairs should be sorted by ``left_idx`` and only involve non-empty
+    geometries. A left geometry with several candidates is prepared once
+    for all of them.
+    """
+    result = np.zeros(len(left_idx), dtype=bool)
+    if not len(left_idx):
+        return result
+    func = getattr(BaseGeometry, op)
+    starts = np.flatnonzero(np.diff(left_idx)) + 1
+    starts = np.concatenate([[0], starts])
+    ends = np.append(starts[1:], len(left_idx))
+    for start, end in zip(starts, ends):
+        geom = left.data[left_idx[start]]
+        others = right.data[right_idx[start:end]]
+        if end - start > 1:
+            pred = getattr(prep(geom), op)
+            result[start:end] = [pred(other) for other in others]
+        else:
+            result[start] = func(geom, others[0])
+    return result
+
+
+def _binary_op(op, left, right, *args, **kwargs):
+    """
+    Binary operation that returns a float numpy array (e.g. ``distance``
+    or ``project``).
+
+    ``right`` can be a GeometryArray of the same length as ``left``
+    (element-wise operation) or a single geometry. Pairs involving an empty
+    or missing geometry get NaN.
+    """
+    return _binary_method(op, left, right, float, np.nan, _null_or_empty,
+                          *args, **kwargs)
+
+
+def _binary_geo(op, left, right):
+    """
+    Binary operation that returns a GeometryArray.
+
+    ``right`` can be a GeometryArray of the same length as ``left``
+    (element-wise operation) or a single geometry.
+    """
+    out = np.empty(len(left), dtype=object)
+    if isinstance(right, GeometryArray):
+        _check_lengths(left, right)
+        for i, (this_elem, other_elem) in enumerate(zip(left.data,
+                                                        right.data)):
+            out[i] = getattr(this_elem, op)(other_elem)
+    else:
+        for i, geom in enumerate(left.data):
+            out[i] = getattr(geom, op)(right)
+    return GeometryArray(out)
+
+
+#
+# Coordinate-level operations
+#
+
+_WKB_Z_FLAG = 0x80000000
+_WKB_SRID_FLAG = 0x20000000
+
+_wkb_reader = None
+_wkb_writer = None
+
+
+def _wkb_io():
+    """Reusable (little endian) WKB writer and reader."""
+    global _wkb_reader, _wkb_writer
+    if _wkb_writer is None:
+        _wkb_writer = WKBWriter(lgeos, big_endian=False)
+        _wkb_reader = WKBReader(lgeos)
+    return _wkb_writer, _wkb_reader
+
+
+def _wkb_coordinate_runs(wkb, pos, runs):
+    """
+    Parse the (little endian) WKB geometry starting at byte ``pos`` and
+    append the ``(byte offset, number of points, ndim)`` of each of its
+    coordinate sequences to ``runs``. Returns the end position.
+    """
+    byte_order, geom_type = struct.unpack_from('<BI', wkb, pos)
+    if byte_order != 1:
+        raise ValueError("Only little endian WKB is supported")
+    pos += 5
+    if geom_type & _WKB_SRID_FLAG:
+        pos += 4
+    ndim = 3 if geom_type & _WKB_Z_FLAG else 2
+    base_type = geom_type & 0xff
+    if base_type == 1:
+        runs.append((pos, 1, ndim))
+        return pos + 8 * ndim
+    (count,) = struct.unpack_from('<I', wkb, pos)
+    pos += 4
+    if base_type == 2:
+        runs.append((pos, count, ndim))
+        return pos + 8 * ndim * count
+    elif base_type == 3:
+        for _ in range(count):
+            (npoints,) = struct.unpack_from('<I', wkb, pos)
+            runs.append((pos + 4, npoints, ndim))
+            pos += 4 + 8 * ndim * npoints
+        return pos
+    else:
+        # multi-part geometries and collections
+        for _ in range(count):
+            pos = _wkb_coordinate_runs(wkb, pos, runs)
+        return pos
+
+
+class _CoordinateBuffer(object):
+    """
+    All coordinates of a ``GeometryArray`` gathered in a single array.
+
+    Shapely has no bulk access to coordinates, so the geometries are
+    serialized to one (little endian) WKB buffer and the coordinate values
+    are located in that buffer. After updating the coordinates, the
+    geometries can be rebuilt from the buffer with ``to_geometries``.
+
+    Attributes
+    ----------
+    coords : ndarray
+        Float array of shape ``(N, 3)`` with all coordinates (z is 0 for
+        2D geometries).
+    geom_index : ndarray
+        Position in the array of the geometry each coordinate belongs to
+        (in increasing order).
+    """
+
+    def __init__(self, left):
+        writer, _ = _wkb_io()
+        self.data = left.data
+        wkbs = []
+        positions = []
+        runs = []
+        run_geoms = []
+        nbytes = 0
+        for i, geom in enumerate(left.data):
+            if (not isinstance(geom, BaseGeometry)
+                    or lgeos.GEOSisEmpty(geom._geom)):
+                # (GEOS cannot write empty points to WKB)
+                continue
+            wkb = writer.write(geom)
+            n_runs = len(runs)
+            _wkb_coordinate_runs(wkb, 0, runs)
+            if len(runs) == n_runs:
+                # collection of empty parts, nothing to gather
+                continue
+            run_geoms.extend([i] * (len(runs) - n_runs))
+            # store the run offsets relative to the full buffer
+            runs[n_runs:] = [(pos + nbytes, npoints, ndim)
+                             for pos, npoints, ndim in runs[n_runs:]]
+            positions.append(i)
+            wkbs.append(wkb)
+            nbytes += len(wkb)
+        self.positions = positions
+        self.wkbs = wkbs
+
+        if not runs:
+            self.buffer = np.empty(0, dtype=np.uint8)
+            self.offset = np.empty(0, dtype='int64')
+            self.has_z = np.empty(0, dtype=bool)
+            self.coords = np.empty((0, 3), dtype=float)
+            self.geom_index = np.empty(0, dtype='int64')
+            return
+
+        buf = np.frombuffer(b''.join(wkbs), dtype=np.uint8).copy()
+        run_start, run_npoints, run_ndim = (
+            np.array(col, dtype='int64') for col in zip(*runs))
+
+        # byte offset in the buffer of the x value of each coordinate
+        coord_run = np.repeat(np.arange(len(runs)), run_npoints)
+        first_coord = np.cumsum(run_npoints) - run_npoints
+        coord_ndim = run_ndim[coord_run]
+        offset = (run_start[coord_run] + 8 * coord_ndim *
+                  (np.arange(len(coord_run)) - first_coord[coord_run]))
+
+        self.buffer = buf
+        self.offset = offset
+        self.has_z = coord_ndim == 3
+        self.coords = np.zeros((len(offset), 3), dtype=float)
+        for floats, k, idx in self._float_views(buf):
+            self.coords[k, 0] = floats[idx]
+            self.coords[k, 1] = floats[idx + 1]
+            has_z = self.has_z[k]
+            self.coords[k[has_z], 2] = floats[idx[has_z] + 2]
+        self.geom_index = np.repeat(np.asarray(run_geoms, dtype='int64'),
+                                    run_npoints)
+
+    def _float_views(self, buf):
+        """
+        The coordinate values are not aligned in the buffer. Yield a float
+        view on ``buf`` for each alignment (byte offset modulo 8) together
+        with the positions ``k`` of the coordinates with that alignment and
+        the index of their x values in the view.
+        """
+        phase = self.offset % 8
+        for p in np.flatnonzero(np.bincount(phase, minlength=8)):
+            k = np.flatnonzero(phase == p)
+            floats = buf[p:p + 8 * ((len(buf) - p) // 8)].view('<f8')
+            yield floats, k, (self.offset[k] - p) // 8
+
+    def bounds(self):
+        """Bounds of each geometry, NaN for missing or empty geometries."""
+        bounds = np.empty((len(self.data), 4), dtype=float)
+        bounds.fill(np.nan)
+        if len(self.coords):
+            # coordinates are grouped per geometry
+            starts = np.flatnonzero(np.diff(self.geom_index)) + 1
+            starts = np.concatenate([[0], starts])
+            rows = self.geom_index[starts]
+            xy = self.coords[:, :2]
+            bounds[rows, :2] = np.minimum.reduceat(xy, starts)
+            bounds[rows, 2:] = np.maximum.reduceat(xy, starts)
+        return bounds
+
+    def to_geometries(self, coords):
+        """
+        Rebuild the geometries with the given ``(N, 3)`` coordinates (z is
+        ignored for 2D geometries). Missing and empty geometries are kept.
+        """
+        _, reader = _wkb_io()
+        out = self.data.copy()
+        if not len(self.coords):
+            return GeometryArray(out)
+        coords = np.asarray(coords, dtype=float)
+        buf = self.buffer.copy()
+        for floats, k, idx in self._float_views(buf):
+            floats[idx] = coords[k, 0]
+            floats[idx + 1] = coords[k, 1]
+            has_z = self.has_z[k]
+            floats[idx[has_z] + 2] = coords[k[has_z], 2]
+
+        start = 0
+        for i, wkb in zip(self.positions, self.wkbs):
+            end = start + len(wkb)
+            geom = reader.read(buf[start:end].tobytes())
+            if isinstance(self.data[i], LinearRing):
+                # WKB has no LinearRing type
+                geom = LinearRing(geom)
+            out[i] = geom
+            start = end
+        return GeometryArray(out)
+
+
+def _transform_coordinates(left, func):
+    """
+    Apply a vectorized coordinate transformation to all geometries.
+
+    Parameters
+    ----------
+    left : GeometryArray
+    func : callable
+        Called once as ``func(coords, geom_index, has_z)`` with the
+        ``(N, 3)`` array of all coordinates (z is 0 for 2D geometries), the
+        position of the geometry each coordinate belongs to and whether
+        each coordinate belongs to a 3D geometry. Returns the transformed
+        ``(N, 3)`` coordinates; z is ignored for 2D geometries.
+
+    Returns
+    -------
+    GeometryArray
+    """
+    coords = _CoordinateBuffer(left)
+    if not len(coords.coords):
+        return GeometryArray(left.data.copy())
+    return coords.to_geometries(func(coords.coords, coords.geom_index,
+                                     coords.has_z))
+
+
+def _affine_transform(left, matrix):
+    """
+    Apply an affine transformation to all geometries.
+
+    Parameters
+    ----------
+    left : GeometryArray
+    matrix : array-like
+        Either a single matrix, given as 6 values ``[a, b, d, e, xoff, yoff]``
+        for 2D or 12 values ``[a, b, c, d, e, f, g, h, i, xoff, yoff, zoff]``
+        for 3D transformations (as in ``shapely.affinity.affine_transform``),
+        or an array of shape ``(n, 6)`` or ``(n, 12)`` with a matrix per
+        geometry.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.shape[-1] not in (6, 12) or matrix.ndim > 2:
+        raise ValueError("The affine transformation matrix should have 6 or "
+                         "12 values per geometry")
+    if matrix.ndim == 2 and len(matrix) != len(left):
+        raise ValueError("Length of the matrices ({0}) does not match the "
+                         "length of the geometries ({1})".format(len(matrix),
+                                                                 len(left)))
+    if matrix.shape[-1] == 6:
+        a, b, d, e, xoff, yoff = np.moveaxis(matrix, -1, 0)
+        zero, one = np.zeros_like(a), np.ones_like(a)
+        matrix = np.stack([a, b, zero, d, e, zero, zero, zero, one,
+                           xoff, yoff, zero], axis=-1)
+
+    def transform(coords, geom_index, has_z):
+        if matrix.ndim == 2:
+            # only expand the coefficients that differ between the rows
+            used = np.zeros(len(matrix), dtype=bool)
+            used[geom_index] = True
+            rows = matrix[used]
+            m = [rows[0, k] if (rows[:, k] == rows[0, k]).all()
+                 else matrix[geom_index, k] for k in range(12)]
+        else:
+            m = matrix
+        result = np.zeros_like(coords)
+        for i in range(3):
+            out = result[:, i]
+            for k in range(3):
+                coef = m[3 * i + k]
+                if np.ndim(coef) or coef != 0:
+                    out += coef * coords[:, k]
+            out += m[9 + i]
+        return result
+
+    return _transform_coordinates(left, transform)
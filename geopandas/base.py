@@ -1,22 +1,30 @@
 from warnings import warn
 
 import numpy as np
-import pandas as pd
 from pandas import Series, DataFrame, MultiIndex
 from pandas.core.indexing import _NDFrameIndexer
+from six import string_types
 from shapely.geometry import box, MultiPoint, MultiLineString, MultiPolygon
+from shapely.geometry.base import BaseGeometry
 from shapely.ops import cascaded_union, unary_union
-import shapely.affinity as affinity
 
 import geopandas as gpd
+from geopandas.array import (
+    GeometryArray, _affine_transform, _bbox_candidates, _binary_geo,
+    _binary_op, _binary_predicate, _total_bounds, _unary_geo,
+    _unary_geo_per_row, _unary_op)
 
-try:
-    from rtree.core import RTreeError
-    HAS_SINDEX = True
-except ImportError:
-    class RTreeError(Exception):
-        pass
-    HAS_SINDEX = False
+# the spatial index and sjoin do not depend on rtree anymore, the spatial
+# index is always available
+HAS_SINDEX = True
+
+
+def _align(this, other):
+    """Align two GeoSeries, skipping the reindexing if both already share
+    the same index"""
+    if this.index.equals(other.index):
+        return this, other
+    return this.align(other)
 
 
 def _geo_op(this, other, op):
@@ -27,74 +35,276 @@ def _geo_op(this, other, op):
         if crs != other.crs:
             warn('GeoSeries crs mismatch: {0} and {1}'.format(this.crs,
                                                               other.crs))
-        this, other = this.align(other.geometry)
-        return gpd.GeoSeries([getattr(this_elem, op)(other_elem)
-                             for this_elem, other_elem in zip(this, other)],
-                             index=this.index, crs=crs)
+        this, other = _align(this, other.geometry)
+        data = _binary_geo(op, this._geometry_array, other._geometry_array)
+        return gpd.GeoSeries(data, index=this.index, crs=crs)
     else:
-        return gpd.GeoSeries([getattr(s, op)(other)
-                             for s in this.geometry],
-                             index=this.index, crs=this.crs)
+        data = _binary_geo(op, this._geometry_array, other)
+        return gpd.GeoSeries(data, index=this.index, crs=this.crs)
 
 
 # TODO: think about merging with _geo_op
 def _series_op(this, other, op, **kwargs):
     """Geometric operation that returns a pandas Series"""
-    null_val = False if op != 'distance' else np.nan
-
+    if op in ('distance', 'project'):
+        func = _binary_op
+    else:
+        func = _binary_predicate
     if isinstance(other, GeoPandasBase):
         this = this.geometry
-        this, other = this.align(other.geometry)
-        return Series([getattr(this_elem, op)(other_elem, **kwargs)
-                    if not this_elem.is_empty | other_elem.is_empty else null_val
-                    for this_elem, other_elem in zip(this, other)],
-                    index=this.index)
+        this, other = _align(this, other.geometry)
+        data = func(op, this._geometry_array, other._geometry_array,
+                    **kwargs)
     else:
-        return Series([getattr(s, op)(other, **kwargs) if s else null_val
-                      for s in this.geometry], index=this.index)
+        candidates = None
+        if (this._bounds_cache is not None and not kwargs
+                and isinstance(other, BaseGeometry) and not other.is_empty):
+            # reuse the cached bounds to skip rows that cannot match
+            candidates = _bbox_candidates(op, this._bounds_cache,
+                                          other.bounds)
+        if candidates is not None:
+            idx = np.flatnonzero(candidates)
+            data = np.zeros(len(this), dtype=bool)
+            data[idx] = func(op, this._geometry_array[idx], other)
+        else:
+            data = func(op, this._geometry_array, other, **kwargs)
+    return Series(data, index=this.index)
 
 
-def _geo_unary_op(this, op):
+def _geo_unary_op(this, op, *args, **kwargs):
     """Unary operation that returns a GeoSeries"""
-    return gpd.GeoSeries([getattr(geom, op) for geom in this.geometry],
-                     index=this.index, crs=this.crs)
-
-
-def _series_unary_op(this, op, null_value=False):
+    return gpd.GeoSeries(_unary_geo(op, this._geometry_array, *args,
+                                    **kwargs),
+                         index=this.index, crs=this.crs)
+
+
+def _geo_unary_op_per_row(this, op, values, *args, **kwargs):
+    """Unary operation that returns a GeoSeries, where the first argument
+    of the operation can be given per row (scalar, array or Series)"""
+    if np.ndim(values) == 0:
+        return _geo_unary_op(this, op, values, *args, **kwargs)
+    if isinstance(values, Series) and not values.index.equals(this.index):
+        raise ValueError("Index values of the {0} argument do not match the "
+                         "index of the GeoSeries".format(op))
+    return gpd.GeoSeries(_unary_geo_per_row(op, this._geometry_array,
+                                            values, *args, **kwargs),
+                         index=this.index, crs=this.crs)
+
+
+def _affine_op(this, matrix):
+    """Affine transformation that returns a GeoSeries. The coefficients
+    of ``matrix`` can be scalars or arrays with a value per row."""
+    matrix = np.stack(np.broadcast_arrays(*matrix), axis=-1)
+    return gpd.GeoSeries(_affine_transform(this._geometry_array, matrix),
+                         index=this.index, crs=this.crs)
+
+
+def _affine_origin(this, origin):
+    """Interpret the origin of an affine transformation like
+    ``shapely.affinity`` does, returning (x0, y0, z0) as scalars or, for
+    'center' and 'centroid', as arrays with a value per row."""
+    if isinstance(origin, string_types):
+        if origin == 'center':
+            bounds = this._geometry_bounds
+            x0 = (bounds[:, 0] + bounds[:, 2]) / 2.0
+            y0 = (bounds[:, 1] + bounds[:, 3]) / 2.0
+            return x0, y0, 0.0
+        elif origin == 'centroid':
+            centroids = _unary_geo('centroid', this._geometry_array)
+            coords = np.array([c.coords[0] if c is not None and
+                               not c.is_empty else (np.nan, np.nan)
+                               for c in centroids],
+                              dtype=float).reshape(-1, 2)
+            return coords[:, 0], coords[:, 1], 0.0
+        raise ValueError("'origin' keyword {0!r} is not recognized".format(
+            origin))
+    if isinstance(origin, BaseGeometry):
+        if origin.geom_type != 'Point':
+            raise ValueError("'origin' must be a Point geometry")
+        origin = origin.coords[0]
+    if len(origin) == 2:
+        return origin[0], origin[1], 0.0
+    elif len(origin) == 3:
+        return tuple(origin)
+    raise ValueError("Expected number of items in 'origin' to be either 2 "
+                     "or 3")
+
+
+def _series_unary_op(this, op, null_value=False, dtype=None):
     """Unary operation that returns a Series"""
-    return Series([getattr(geom, op, null_value) for geom in this.geometry],
-                     index=this.index)
+    return Series(_unary_op(op, this._geometry_array, null_value=null_value,
+                            dtype=dtype),
+                  index=this.index)
 
 
 class GeoPandasBase(object):
     _sindex = None
     _sindex_generated = False
+    _sindex_file = None
+    _bounds_cache = None
+    _total_bounds_cache = None
+    _valid_cache = None
 
     def _generate_sindex(self):
-        if not HAS_SINDEX:
-            warn("Cannot generate spatial index: Missing package `rtree`.")
-        else:
-            from geopandas.sindex import SpatialIndex
-            stream = ((i, item.bounds, idx) for i, (idx, item) in
-                   enumerate(self.geometry.iteritems()) if
-                   pd.notnull(item) and not item.is_empty)
+        from geopandas.sindex import SpatialIndex
+        sindex = None
+        if self._sindex_file is not None:
+            # index saved next to the data file that was read
             try:
-                self._sindex = SpatialIndex(stream)
-            # What we really want here is an empty generator error, or
-            # for the bulk loader to log that the generator was empty
-            # and move on. See https://github.com/Toblerity/rtree/issues/20.
-            except RTreeError:
-                pass
+                sindex = SpatialIndex.load(self._sindex_file,
+                                           objects=self.index,
+                                           geometries=self._geometry_array)
+            except (IOError, ValueError) as err:
+                warn("Cannot use the saved spatial index, rebuilding it: "
+                     "{0}".format(err))
+        if sindex is None:
+            # bulk load the tree from the cached bounds; missing and empty
+            # geometries (NaN bounds) are left out
+            sindex = SpatialIndex(self._geometry_bounds, objects=self.index,
+                                  geometries=self._geometry_array)
+        if not sindex.is_empty:
+            self._sindex = sindex
         self._sindex_generated = True
 
+    @property
+    def _geometry_array(self):
+        """``GeometryArray`` view on the values of the geometry column."""
+        return GeometryArray(np.asarray(self.geometry.values))
+
+    @property
+    def _geometry_bounds(self):
+        """
+        Cached ``(n, 4)`` float array with the bounds of each geometry (NaN
+        for missing or empty geometries).
+
+        Computed once and dropped together with the spatial index in
+        ``_invalidate_sindex``.
+        """
+        if self._bounds_cache is None:
+            self._bounds_cache = self._geometry_array.bounds
+        return self._bounds_cache
+
+    @property
+    def _geometry_valid(self):
+        """
+        Cached boolean array with the validity of each geometry (False for
+        missing geometries), so that repeated validity checks (``is_valid``,
+        ``overlay``) of the same geometries are free.
+
+        Computed once and dropped together with the spatial index in
+        ``_invalidate_sindex``.
+        """
+        if self._valid_cache is None:
+            self._valid_cache = _unary_op('is_valid', self._geometry_array,
+                                          null_value=False)
+        return self._valid_cache
+
     def _invalidate_sindex(self):
         """
         Indicates that the spatial index should be re-built next
-        time it's requested.
+        time it's requested. Also drops the cached bounds and validity and
+        forgets the saved spatial index.
 
         """
         self._sindex = None
         self._sindex_generated = False
+        self._sindex_file = None
+        self._bounds_cache = None
+        self._total_bounds_cache = None
+        self._valid_cache = None
+
+    def _reuse_sindex(self, source):
+        """
+        Reuse the cached bounds, validity and spatial index of ``source`` if
+        the
+        geometries of this object are those of the rows of ``source`` with
+        the same labels (e.g. a copy, a column selection or a row subset of
+        ``source``).
+
+        The spatial index is immutable and shared if the rows are the same;
+        for a subset or a reordering of the rows, it is remapped to the new
+        positions. Nothing is reused if the rows cannot be matched.
+        """
+        if (source._bounds_cache is None and source._valid_cache is None
+                and not source._sindex_generated
+                and source._sindex_file is None):
+            return
+        if self.index is source.index:
+            positions = None
+        elif not source.index.is_unique:
+            # the labels do not identify the rows
+            return
+        elif self.index.equals(source.index):
+            positions = None
+        else:
+            positions = source.index.get_indexer(self.index)
+            if (positions < 0).any():
+                return
+
+        if source._bounds_cache is not None:
+            self._bounds_cache = (source._bounds_cache if positions is None
+                                  else source._bounds_cache[positions])
+        if source._valid_cache is not None:
+            self._valid_cache = (source._valid_cache if positions is None
+                                 else source._valid_cache[positions])
+        if positions is None:
+            self._total_bounds_cache = source._total_bounds_cache
+            self._sindex_file = source._sindex_file
+        if source._sindex_generated:
+            sindex = source._sindex
+            if sindex is not None:
+                sindex = sindex._subset(positions, objects=self.index,
+                                        geometries=self._geometry_array)
+                if sindex is None:
+                    # cheaper to build anew (from the reused bounds)
+                    return
+                if sindex.is_empty:
+                    sindex = None
+            self._sindex = sindex
+            self._sindex_generated = True
+
+    def _append_sindex(self, sources):
+        """
+        Extend the spatial index of the first of ``sources`` with the
+        geometries of the others, if this object is the (row-wise)
+        concatenation of ``sources``.
+
+        The index of the first object is not rebuilt: the geometries of the
+        others are added to its (small) tree of appended rows, see
+        ``SpatialIndex.append``.
+        """
+        sources = list(sources)
+        if not sources or not all(isinstance(src, GeoPandasBase)
+                                  for src in sources):
+            return
+        first = sources[0]
+        if not first._sindex_generated or first._sindex is None:
+            return
+        name = getattr(self, '_geometry_column_name', None)
+        if any(getattr(src, '_geometry_column_name', None) != name
+               for src in sources):
+            return
+        if len(self) != sum(len(src) for src in sources):
+            return
+        if isinstance(self, DataFrame) and not self.columns.is_unique:
+            # e.g. concatenated along the columns
+            return
+
+        bounds = np.concatenate([src._geometry_bounds for src in sources])
+        self._bounds_cache = bounds
+        if all(src._valid_cache is not None for src in sources):
+            self._valid_cache = np.concatenate([src._valid_cache
+                                                for src in sources])
+        self._sindex = first._sindex.append(
+            bounds[len(first):], objects=self.index,
+            geometries=self._geometry_array)
+        self._sindex_generated = True
+
+    def _maybe_update_cacher(self, clear=False, verify_is_copy=True):
+        # called by pandas after the data have been modified in place
+        self._invalidate_sindex()
+        super(GeoPandasBase, self)._maybe_update_cacher(
+            clear=clear, verify_is_copy=verify_is_copy)
 
     @property
     def area(self):
@@ -122,7 +332,7 @@ class GeoPandasBase(object):
     def is_valid(self):
         """Returns a ``Series`` of ``dtype('bool')`` with value ``True`` for
         geometries that are valid."""
-        return _series_unary_op(self, 'is_valid', null_value=False)
+        return Series(self._geometry_valid.copy(), index=self.index)
 
     @property
     def is_empty(self):
@@ -202,15 +412,14 @@ class GeoPandasBase(object):
         Applies to GeoSeries containing only Polygons.
         """
         # TODO: return empty list or None for non-polygons
-        return _series_unary_op(self, 'interiors', null_value=False)
+        return _series_unary_op(self, 'interiors', null_value=False,
+                                dtype=object)
 
     def representative_point(self):
         """Returns a ``GeoSeries`` of (cheaply computed) points that are
         guaranteed to be within each geometry.
         """
-        return gpd.GeoSeries([geom.representative_point()
-                             for geom in self.geometry],
-                         index=self.index)
+        return _geo_unary_op(self, 'representative_point')
 
     #
     # Reduction operations that return a Shapely geometry
@@ -453,10 +662,9 @@ class GeoPandasBase(object):
 
         See ``GeoSeries.total_bounds`` for the limits of the entire series.
         """
-        bounds = np.array([geom.bounds for geom in self.geometry])
-        return DataFrame(bounds,
+        return DataFrame(self._geometry_bounds,
                          columns=['minx', 'miny', 'maxx', 'maxy'],
-                         index=self.index)
+                         index=self.index, copy=True)
 
     @property
     def total_bounds(self):
@@ -466,16 +674,21 @@ class GeoPandasBase(object):
         See ``GeoSeries.bounds`` for the bounds of the geometries contained in
         the series.
         """
-        b = self.bounds
-        return np.array((b['minx'].min(),
-                         b['miny'].min(),
-                         b['maxx'].max(),
-                         b['maxy'].max()))
+        if self._total_bounds_cache is None:
+            self._total_bounds_cache = _total_bounds(self._geometry_bounds)
+        return self._total_bounds_cache.copy()
 
     @property
     def sindex(self):
         if not self._sindex_generated:
             self._generate_sindex()
+        elif (self._sindex is not None and
+                self._sindex.objects is not self.index):
+            # the index labels were changed (e.g. ``df.index = ...``) since
+            # the spatial index was built or shared with this object
+            self._sindex = self._sindex._subset(
+                None, objects=self.index,
+                geometries=self._sindex.geometries)
         return self._sindex
 
     def buffer(self, distance, resolution=16, **kwargs):
@@ -487,14 +700,14 @@ class GeoPandasBase(object):
 
         Parameters
         ----------
-        distance : float
-            The radius of the buffer.
+        distance : float, array or Series of floats
+            The radius of the buffer, either a single value or one value
+            per geometry.
         resolution: float
             Optional, the resolution of the buffer around each vertex.
         """
-        return gpd.GeoSeries([geom.buffer(distance, resolution, **kwargs)
-                             for geom in self.geometry],
-                         index=self.index, crs=self.crs)
+        return _geo_unary_op_per_row(self, 'buffer', distance, resolution,
+                                     **kwargs)
 
     def simplify(self, *args, **kwargs):
         """Returns a ``GeoSeries`` containing a simplified representation of
@@ -512,9 +725,7 @@ class GeoPandasBase(object):
             False uses a quicker algorithm, but may produce self-intersecting
             or otherwise invalid geometries.
         """
-        return gpd.GeoSeries([geom.simplify(*args, **kwargs)
-                             for geom in self.geometry],
-                      index=self.index, crs=self.crs)
+        return _geo_unary_op(self, 'simplify', *args, **kwargs)
 
     def relate(self, other):
         raise NotImplementedError
@@ -549,9 +760,28 @@ class GeoPandasBase(object):
             of the geometric object's length.
         """
 
-        return gpd.GeoSeries([s.interpolate(distance, normalized)
-                             for s in self.geometry],
-            index=self.index, crs=self.crs)
+        return _geo_unary_op_per_row(self, 'interpolate', distance,
+                                     normalized)
+
+    def affine_transform(self, matrix):
+        """Returns a ``GeoSeries`` with transformed geometries.
+
+        The transformation is applied to all coordinates at once instead of
+        geometry by geometry.
+
+        See http://shapely.readthedocs.io/en/latest/manual.html#shapely.affinity.affine_transform
+        for details.
+
+        Parameters
+        ----------
+        matrix : list, tuple or array
+            The 6 (2D) or 12 (3D) coefficients of the transformation matrix,
+            ``[a, b, d, e, xoff, yoff]`` or
+            ``[a, b, c, d, e, f, g, h, i, xoff, yoff, zoff]``, or an array
+            of shape (n, 6) or (n, 12) with a matrix for each geometry.
+        """
+        return gpd.GeoSeries(_affine_transform(self._geometry_array, matrix),
+                             index=self.index, crs=self.crs)
 
     def translate(self, xoff=0.0, yoff=0.0, zoff=0.0):
         """Returns a ``GeoSeries`` with translated geometries.
@@ -566,9 +796,8 @@ class GeoPandasBase(object):
             xoff, yoff, and zoff for translation along the x, y, and z
             dimensions respectively.
         """
-        return gpd.GeoSeries([affinity.translate(s, xoff, yoff, zoff)
-                             for s in self.geometry],
-            index=self.index, crs=self.crs)
+        return _affine_op(self, (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0,
+                                 xoff, yoff, zoff))
 
     def rotate(self, angle, origin='center', use_radians=False):
         """Returns a ``GeoSeries`` with rotated geometries.
@@ -589,9 +818,20 @@ class GeoPandasBase(object):
         use_radians : boolean
             Whether to interpret the angle of rotation as degrees or radians
         """
-        return gpd.GeoSeries([affinity.rotate(s, angle, origin=origin,
-            use_radians=use_radians) for s in self.geometry],
-            index=self.index, crs=self.crs)
+        if not use_radians:
+            angle = np.radians(angle)
+        cosp = np.cos(angle)
+        sinp = np.sin(angle)
+        # same rounding of near-zero values as shapely.affinity.rotate
+        if abs(cosp) < 2.5e-16:
+            cosp = 0.0
+        if abs(sinp) < 2.5e-16:
+            sinp = 0.0
+        x0, y0, _ = _affine_origin(self, origin)
+        return _affine_op(self, (cosp, -sinp, 0.0, sinp, cosp, 0.0,
+                                 0.0, 0.0, 1.0,
+                                 x0 - x0 * cosp + y0 * sinp,
+                                 y0 - x0 * sinp - y0 * cosp, 0.0))
 
     def scale(self, xfact=1.0, yfact=1.0, zfact=1.0, origin='center'):
         """Returns a ``GeoSeries`` with scaled geometries.
@@ -611,9 +851,11 @@ class GeoPandasBase(object):
             box center (default), 'centroid' for the geometry's 2D centroid, a
             Point object or a coordinate tuple (x, y, z).
         """
-        return gpd.GeoSeries([affinity.scale(s, xfact, yfact, zfact,
-            origin=origin) for s in self.geometry], index=self.index,
-            crs=self.crs)
+        x0, y0, z0 = _affine_origin(self, origin)
+        return _affine_op(self, (xfact, 0.0, 0.0, 0.0, yfact, 0.0,
+                                 0.0, 0.0, zfact,
+                                 x0 - x0 * xfact, y0 - y0 * yfact,
+                                 z0 - z0 * zfact))
 
     def skew(self, xs=0.0, ys=0.0, origin='center', use_radians=False):
         """Returns a ``GeoSeries`` with skewed geometries.
@@ -636,9 +878,15 @@ class GeoPandasBase(object):
         use_radians : boolean
             Whether to interpret the shear angle(s) as degrees or radians
         """
-        return gpd.GeoSeries([affinity.skew(s, xs, ys, origin=origin,
-            use_radians=use_radians) for s in self.geometry],
-            index=self.index, crs=self.crs)
+        if not use_radians:
+            xs = np.radians(xs)
+            ys = np.radians(ys)
+        tanx = np.tan(xs)
+        tany = np.tan(ys)
+        x0, y0, _ = _affine_origin(self, origin)
+        return _affine_op(self, (1.0, tanx, 0.0, tany, 1.0, 0.0,
+                                 0.0, 0.0, 1.0,
+                                 -y0 * tanx, -x0 * tany, 0.0))
 
     def explode(self):
         """
@@ -709,5 +957,10 @@ class _CoordinateIndexer(_NDFrameIndexer):
                    ys.start if ys.start is not None else ymin,
                    xs.stop if xs.stop is not None else xmax,
                    ys.stop if ys.stop is not None else ymax)
-        idx = obj.intersects(bbox)
-        return obj[idx]
+        # only test the geometries whose bounds overlap with the box
+        mask = _bbox_candidates('intersects', obj._geometry_bounds,
+                                bbox.bounds)
+        idx = np.flatnonzero(mask)
+        mask[idx] = _binary_predicate('intersects',
+                                      obj._geometry_array[idx], bbox)
+        return obj[mask]
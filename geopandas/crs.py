@@ -0,0 +1,184 @@
+"""
+Reusable coordinate transformations.
+
+Setting up a transformation between two coordinate reference systems
+(building the ``pyproj.Proj`` objects and, with pyproj >= 2, the
+``pyproj.Transformer``) can cost more than transforming the coordinates of
+a small GeoSeries. The transformations are therefore kept in a process-wide
+least recently used cache, ``transformer_cache``, keyed by the normalized
+source and target crs.
+
+Example
+-------
+>>> from geopandas.crs import transformer_cache
+>>> transformer_cache.maxsize = 64   # number of crs pairs kept
+>>> transformer_cache.cache_info()
+CacheInfo(hits=0, misses=0, maxsize=64, currsize=0)
+"""
+from collections import namedtuple, OrderedDict
+import threading
+
+import numpy as np
+import pyproj
+from six import iteritems, string_types
+
+from geopandas._parallel import _map, _n_jobs
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def _crs_key(crs):
+    """Hashable, normalized representation of a crs dict or string."""
+    if isinstance(crs, dict):
+        return tuple(sorted((str(k), str(v)) for k, v in iteritems(crs)))
+    if isinstance(crs, string_types):
+        return ' '.join(crs.split())
+    return crs
+
+
+class Transformer(object):
+    """
+    Transformation of coordinates from one crs to another.
+
+    Parameters
+    ----------
+    crs_from, crs_to : dict or str
+        Source and target crs, in any form accepted by ``pyproj.Proj``.
+    """
+
+    def __init__(self, crs_from, crs_to):
+        self.proj_in = pyproj.Proj(crs_from, preserve_units=True)
+        self.proj_out = pyproj.Proj(crs_to, preserve_units=True)
+        # pyproj >= 2 sets up the transformation once, but its transformer
+        # objects cannot be shared between threads
+        self._local = threading.local()
+        self._get_transformer()
+
+    def _get_transformer(self):
+        if not hasattr(pyproj, 'Transformer'):
+            return None
+        transformer = getattr(self._local, 'transformer', None)
+        if transformer is None:
+            transformer = pyproj.Transformer.from_proj(self.proj_in,
+                                                       self.proj_out)
+            self._local.transformer = transformer
+        return transformer
+
+    def transform(self, x, y, z=None):
+        """
+        Transform coordinate arrays; returns ``(x, y)``, or ``(x, y, z)``
+        if ``z`` is given.
+        """
+        transformer = self._get_transformer()
+        if transformer is not None:
+            if z is None:
+                return transformer.transform(x, y)
+            return transformer.transform(x, y, z)
+        if z is None:
+            return pyproj.transform(self.proj_in, self.proj_out, x, y)
+        return pyproj.transform(self.proj_in, self.proj_out, x, y, z)
+
+
+class TransformerCache(object):
+    """
+    Thread-safe least recently used cache of ``Transformer`` objects.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of crs pairs kept. 0 disables the caching.
+    """
+
+    def __init__(self, maxsize=32):
+        self._transformers = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        if value < 0:
+            raise ValueError("maxsize should be a non-negative integer")
+        with self._lock:
+            self._maxsize = value
+            self._evict()
+
+    def _evict(self):
+        while len(self._transformers) > self._maxsize:
+            self._transformers.popitem(last=False)
+
+    def get(self, crs_from, crs_to):
+        """Return a (cached) ``Transformer`` from ``crs_from`` to ``crs_to``."""
+        key = (_crs_key(crs_from), _crs_key(crs_to))
+        with self._lock:
+            transformer = self._transformers.pop(key, None)
+            if transformer is not None:
+                self.hits += 1
+                self._transformers[key] = transformer
+                return transformer
+            self.misses += 1
+        # created outside of the lock, an identical concurrent miss only
+        # results in a duplicate setup
+        transformer = Transformer(crs_from, crs_to)
+        with self._lock:
+            self._transformers[key] = transformer
+            self._evict()
+        return transformer
+
+    def clear(self):
+        """Remove all transformers and reset the hit and miss counters."""
+        with self._lock:
+            self._transformers.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        """Return the hits, misses, maxsize and current size of the cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self._maxsize,
+                             len(self._transformers))
+
+
+transformer_cache = TransformerCache()
+
+
+def _transform_chunk(args):
+    """Transform one chunk of coordinates (module level to be picklable)."""
+    crs_from, crs_to, x, y, z = args
+    return transformer_cache.get(crs_from, crs_to).transform(x, y, z)
+
+
+def _transform_coords(crs_from, crs_to, coords, transform_z=True, n_jobs=1,
+                      executor=None):
+    """
+    Transform an ``(N, 3)`` coordinate array from ``crs_from`` to ``crs_to``.
+
+    The z values are only transformed with ``transform_z`` (e.g. if some of
+    the geometries are 3D, even if all their z values are 0), otherwise they
+    are returned unchanged. With ``n_jobs`` > 1 the coordinates are split in
+    ``n_jobs`` chunks which are transformed concurrently (see
+    ``geopandas._parallel``).
+    """
+    n_jobs = _n_jobs(n_jobs)
+    x, y, z = coords.T
+    if not transform_z:
+        z = None
+    n_chunks = min(n_jobs, len(coords))
+    if n_chunks <= 1:
+        result = transformer_cache.get(crs_from, crs_to).transform(x, y, z)
+    else:
+        bounds = np.linspace(0, len(coords), n_chunks + 1).astype(int)
+        chunks = [(crs_from, crs_to, x[start:end], y[start:end],
+                   None if z is None else z[start:end])
+                  for start, end in zip(bounds[:-1], bounds[1:])]
+        results = list(_map(_transform_chunk, chunks, n_chunks, executor))
+        result = [np.concatenate(values) for values in zip(*results)]
+    if z is None:
+        result = list(result) + [coords[:, 2]]
+    return np.column_stack(result)
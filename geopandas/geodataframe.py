@@ -6,6 +6,7 @@ from shapely.geometry import mapping, shape
 from shapely.geometry.base import BaseGeometry
 from six import string_types, PY3
 
+from geopandas.array import GeometryArray
 from geopandas.base import GeoPandasBase, _CoordinateIndexer
 from geopandas.geoseries import GeoSeries
 from geopandas.plotting import plot_dataframe
@@ -71,7 +72,7 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
 
     def _set_geometry(self, col):
         # TODO: Use pandas' core.common.is_list_like() here.
-        if not isinstance(col, (list, np.ndarray, Series)):
+        if not isinstance(col, (list, np.ndarray, Series, GeometryArray)):
             raise ValueError("Must use a list-like to set the geometry"
                              " property")
         self.set_geometry(col, inplace=True)
@@ -118,8 +119,12 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
 
         to_remove = None
         geo_column_name = self._geometry_column_name
+        # object with the same geometries, to reuse its spatial index
+        source = None
         if isinstance(col, (Series, list, np.ndarray)):
             level = col
+        elif isinstance(col, GeometryArray):
+            level = col.data
         elif hasattr(col, 'ndim') and col.ndim != 1:
             raise ValueError("Must pass array with one dimension only.")
         else:
@@ -134,6 +139,8 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
                 geo_column_name = self._geometry_column_name
             else:
                 geo_column_name = col
+            if col == self._geometry_column_name:
+                source = self
 
         if to_remove:
             del frame[to_remove]
@@ -142,6 +149,9 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
             # Avoids caching issues/crs sharing issues
             level = level.copy()
             level.crs = crs
+        if isinstance(level, GeoSeries):
+            # assigned aligned on the index
+            source = level
 
         # Check that we are using a listlike of geometries
         if not all(isinstance(item, BaseGeometry) or not item for item in level):
@@ -150,6 +160,8 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
         frame._geometry_column_name = geo_column_name
         frame.crs = crs
         frame._invalidate_sindex()
+        if source is not None:
+            frame._reuse_sindex(source)
         if not inplace:
             return frame
 
@@ -400,7 +412,8 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
         from geopandas.io.file import to_file
         to_file(self, filename, driver, schema, **kwargs)
 
-    def to_crs(self, crs=None, epsg=None, inplace=False):
+    def to_crs(self, crs=None, epsg=None, inplace=False, n_jobs=1,
+               executor=None):
         """Transform geometries to a new coordinate reference system.
 
         Transform all geometries in a GeoSeries to a different coordinate
@@ -423,12 +436,20 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
         inplace : bool, optional, default: False
             Whether to return a new GeoDataFrame or do the transformation in
             place.
+        n_jobs : int, default 1
+            Number of chunks the coordinates are split into to be
+            transformed concurrently (-1 for the number of CPUs).
+        executor : object with a ``map`` method, optional
+            Executor running the chunks, e.g. a
+            ``concurrent.futures.ProcessPoolExecutor``. By default a thread
+            pool with ``n_jobs`` threads is used.
         """
         if inplace:
             df = self
         else:
             df = self.copy()
-        geom = df.geometry.to_crs(crs=crs, epsg=epsg)
+        geom = df.geometry.to_crs(crs=crs, epsg=epsg, n_jobs=n_jobs,
+                                  executor=executor)
         df.geometry = geom
         df.crs = geom.crs
         if not inplace:
@@ -446,15 +467,44 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
             result.__class__ = GeoSeries
             result.crs = self.crs
             result._invalidate_sindex()
+            result._reuse_sindex(self)
         elif isinstance(result, DataFrame) and geo_col in result:
             result.__class__ = GeoDataFrame
             result.crs = self.crs
             result._geometry_column_name = geo_col
             result._invalidate_sindex()
+            # column selection or row subset
+            result._reuse_sindex(self)
         elif isinstance(result, DataFrame) and geo_col not in result:
             result.__class__ = DataFrame
         return result
 
+    def __setitem__(self, key, value):
+        super(GeoDataFrame, self).__setitem__(key, value)
+        if not (isinstance(key, string_types)
+                and key != self._geometry_column_name):
+            self._invalidate_sindex()
+
+    def _maybe_cache_changed(self, item, value):
+        # a cached column was modified in place
+        super(GeoDataFrame, self)._maybe_cache_changed(item, value)
+        if item == self._geometry_column_name:
+            self._invalidate_sindex()
+
+    def _set_value(self, index, col, value, takeable=False):
+        # a single value set with .at or .iat, which bypass __setitem__ and
+        # modify the cached column in place
+        result = super(GeoDataFrame, self)._set_value(index, col, value,
+                                                      takeable=takeable)
+        if takeable:
+            col = self.columns[col]
+        if col == self._geometry_column_name:
+            self._invalidate_sindex()
+            geometry = self._item_cache.get(col)
+            if isinstance(geometry, GeoSeries):
+                geometry._invalidate_sindex()
+        return result
+
     #
     # Implement pandas methods
     #
@@ -485,6 +535,7 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
         elif method == 'concat':
             for name in self._metadata:
                 object.__setattr__(self, name, getattr(other.objs[0], name, None))
+            self._append_sindex(other.objs)
         else:
             for name in self._metadata:
                 object.__setattr__(self, name, getattr(other, name, None))
@@ -507,7 +558,9 @@ class GeoDataFrame(GeoPandasBase, DataFrame):
         data = self._data
         if deep:
             data = data.copy()
-        return GeoDataFrame(data).__finalize__(self)
+        copied = GeoDataFrame(data).__finalize__(self)
+        copied._reuse_sindex(self)
+        return copied
 
     def plot(self, *args, **kwargs):
         """Generate a plot of the geometries in the ``GeoDataFrame``.
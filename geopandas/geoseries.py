@@ -1,14 +1,13 @@
-from functools import partial
 import json
 
 import numpy as np
 from pandas import Series
-import pyproj
 from shapely.geometry import shape, Point
 from shapely.geometry.base import BaseGeometry
-from shapely.ops import transform
 
 from geopandas.plotting import plot_series
+from geopandas.array import GeometryArray, _transform_coordinates
+from geopandas.crs import _transform_coords
 from geopandas.base import GeoPandasBase, _series_unary_op, _CoordinateIndexer
 
 
@@ -35,6 +34,11 @@ class GeoSeries(GeoPandasBase, Series):
         # fix problem for scalar geometries passed
         if len(args) == 1 and isinstance(args[0], BaseGeometry):
             args = ([args[0]],)
+        # a GeometryArray is stored through its underlying object array
+        if args and isinstance(args[0], GeometryArray):
+            args = (args[0].data,) + args[1:]
+        if isinstance(kwargs.get('data'), GeometryArray):
+            kwargs['data'] = kwargs['data'].data
 
         crs = kwargs.pop('crs', None)
 
@@ -131,11 +135,26 @@ class GeoSeries(GeoPandasBase, Series):
             val.__class__ = GeoSeries
             val.crs = self.crs
             val._invalidate_sindex()
+        if isinstance(val, GeoSeries) and mtd != 'append':
+            # the rows of the result are rows of self
+            val._reuse_sindex(self)
         return val
 
     def __getitem__(self, key):
         return self._wrapped_pandas_method('__getitem__', key)
 
+    def __setitem__(self, key, value):
+        super(GeoSeries, self).__setitem__(key, value)
+        self._invalidate_sindex()
+
+    def _set_value(self, label, value, takeable=False):
+        # a single value set with .at or .iat, which bypass __setitem__;
+        # also tells a frame this is a cached column of
+        result = super(GeoSeries, self)._set_value(label, value,
+                                                   takeable=takeable)
+        self._maybe_update_cacher()
+        return result
+
     def sort_index(self, *args, **kwargs):
         return self._wrapped_pandas_method('sort_index', *args, **kwargs)
 
@@ -154,6 +173,8 @@ class GeoSeries(GeoPandasBase, Series):
         # NOTE: backported from pandas master (upcoming v0.13)
         for name in self._metadata:
             object.__setattr__(self, name, getattr(other, name, None))
+        if method == 'concat':
+            self._append_sindex(other.objs)
         return self
 
     def copy(self, order='C'):
@@ -170,8 +191,10 @@ class GeoSeries(GeoPandasBase, Series):
         copy : GeoSeries
         """
         # FIXME: this will likely be unnecessary in pandas >= 0.13
-        return GeoSeries(self.values.copy(order), index=self.index,
-                      name=self.name).__finalize__(self)
+        copied = GeoSeries(self.values.copy(order), index=self.index,
+                           name=self.name).__finalize__(self)
+        copied._reuse_sindex(self)
+        return copied
 
     def isna(self):
         """
@@ -268,7 +291,7 @@ class GeoSeries(GeoPandasBase, Series):
     # Additional methods
     #
 
-    def to_crs(self, crs=None, epsg=None):
+    def to_crs(self, crs=None, epsg=None, n_jobs=1, executor=None):
         """Returns a ``GeoSeries`` with all geometries transformed to a new
         coordinate reference system.
 
@@ -289,6 +312,14 @@ class GeoSeries(GeoPandasBase, Series):
             Output projection parameters as string or in dictionary form.
         epsg : int
             EPSG code specifying output projection.
+        n_jobs : int, default 1
+            Number of chunks the coordinates are split into to be
+            transformed concurrently (-1 for the number of CPUs).
+        executor : object with a ``map`` method, optional
+            Executor running the chunks, e.g. a
+            ``concurrent.futures.ProcessPoolExecutor``. By default a thread
+            pool with ``n_jobs`` threads is used. The order of the result
+            does not depend on the order in which the chunks complete.
         """
         from fiona.crs import from_epsg
         if self.crs is None:
@@ -299,14 +330,16 @@ class GeoSeries(GeoPandasBase, Series):
                 crs = from_epsg(epsg)
             except TypeError:
                 raise TypeError('Must set either crs or epsg for output.')
-        proj_in = pyproj.Proj(self.crs, preserve_units=True)
-        proj_out = pyproj.Proj(crs, preserve_units=True)
-        project = partial(pyproj.transform, proj_in, proj_out)
-        result = self.apply(lambda geom: transform(project, geom))
-        result.__class__ = GeoSeries
-        result.crs = crs
-        result._invalidate_sindex()
-        return result
+
+        def project(coords, geom_index, has_z):
+            # all coordinates are transformed at once (or in n_jobs chunks),
+            # z only if there are 3D geometries
+            return _transform_coords(self.crs, crs, coords,
+                                     transform_z=has_z.any(), n_jobs=n_jobs,
+                                     executor=executor)
+
+        data = _transform_coordinates(self._geometry_array, project)
+        return GeoSeries(data, index=self.index, crs=crs, name=self.name)
 
     def to_json(self, **kwargs):
         """
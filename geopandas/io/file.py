@@ -5,6 +5,7 @@ import numpy as np
 import six
 
 from geopandas import GeoDataFrame
+from geopandas.sindex import SIDECAR_SUFFIX, _is_sidecar_of
 
 # Adapted from pandas.io.common
 if six.PY3:
@@ -28,6 +29,19 @@ def _is_url(url):
         return False
 
 
+def _sidecar_path(filename):
+    """
+    Path of the spatial index saved next to ``filename``, or None if
+    ``filename`` is not the path of a local file (e.g. a URL).
+    """
+    if hasattr(filename, '__fspath__'):
+        # e.g. a pathlib.Path
+        filename = filename.__fspath__()
+    if not isinstance(filename, six.string_types) or _is_url(filename):
+        return None
+    return filename + SIDECAR_SUFFIX
+
+
 def read_file(filename, **kwargs):
     """
     Returns a GeoDataFrame from a file or URL.
@@ -47,6 +61,12 @@ def read_file(filename, **kwargs):
     --------
     >>> df = geopandas.read_file("nybb.shp")
 
+    If a spatial index was saved next to the file as ``<filename>.sindex``
+    (with ``df.sindex.save``), it is memory-mapped as the spatial index of
+    the GeoDataFrame instead of building a new one, unless the file was
+    modified since or keywords selecting other rows (``bbox``, ``layer``,
+    ...) are given.
+
     Returns
     -------
     geodataframe : GeoDataFrame
@@ -71,6 +91,14 @@ def read_file(filename, **kwargs):
         columns = list(f.meta["schema"]["properties"]) + ["geometry"]
         gdf = gdf[columns]
 
+    # the saved index matches the rows of the default layer of the version
+    # of the file it was saved for
+    sindex_file = _sidecar_path(filename)
+    if (bbox is None and not kwargs and sindex_file is not None
+            and os.path.isfile(sindex_file)
+            and _is_sidecar_of(sindex_file, filename)):
+        # spatial index saved with gdf.sindex.save, loaded on first use
+        gdf._sindex_file = sindex_file
     return gdf
 
 
@@ -97,10 +125,16 @@ def to_file(df, filename, driver="ESRI Shapefile", schema=None,
 
     The *kwargs* are passed to fiona.open and can be used to write
     to multi-layer data, store data within archives (zip files), etc.
+
+    A spatial index saved next to the file (``<filename>.sindex``) no
+    longer matches it and is removed.
     """
     if schema is None:
         schema = infer_schema(df)
     filename = os.path.abspath(os.path.expanduser(filename))
+    sindex_file = _sidecar_path(filename)
+    if sindex_file is not None and os.path.isfile(sindex_file):
+        os.remove(sindex_file)
     with fiona.drivers():
         with fiona.open(filename, 'w', driver=driver, crs=df.crs,
                         schema=schema, **kwargs) as colxn:
@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
+import os
+
 import fiona
+import numpy as np
 
 import geopandas
 from geopandas import read_postgis, read_file
@@ -54,6 +57,62 @@ class TestIO:
         lower_columns = [c.lower() for c in self.columns]
         assert (df.columns[:-1] == lower_columns).all()
 
+    def test_read_file_saved_sindex(self, tmpdir):
+        path = str(tmpdir.join('boros.shp'))
+        self.df.to_file(path)
+        df = read_file(path)
+        assert df._sindex_file is None
+        df.sindex.save(path + '.sindex')
+
+        df = read_file(path)
+        assert df._sindex_file == path + '.sindex'
+        assert df.sindex.size == 5
+        assert isinstance(df.sindex._nodes, np.memmap)
+        bounds = tuple(df.total_bounds)
+        assert df.sindex.intersection(bounds) == list(range(5))
+
+        # filtered rows do not match the saved index
+        df = read_file(path, bbox=bounds)
+        assert df._sindex_file is None
+        df = read_file(path, layer='boros')
+        assert df._sindex_file is None
+
+    def test_read_file_path(self, tmpdir):
+        pathlib = pytest.importorskip('pathlib')
+        path = pathlib.Path(str(tmpdir.join('boros.shp')))
+        self.df.to_file(path)
+        df = read_file(path)
+        validate_boro_df(df)
+        assert df._sindex_file is None
+
+        df.sindex.save(str(path) + '.sindex')
+        df = read_file(path)
+        assert df._sindex_file == str(path) + '.sindex'
+        assert df.sindex.intersection(tuple(df.total_bounds)) == list(range(5))
+        df.to_file(path)
+        assert not os.path.exists(str(path) + '.sindex')
+
+    def test_read_file_stale_sindex(self, tmpdir):
+        path = str(tmpdir.join('boros.shp'))
+        self.df.to_file(path)
+        read_file(path).sindex.save(path + '.sindex')
+        assert read_file(path)._sindex_file == path + '.sindex'
+
+        # the data file was modified after the index was saved
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        assert read_file(path)._sindex_file is None
+
+        # writing the file removes the saved index
+        read_file(path).sindex.save(path + '.sindex')
+        df = self.df.copy()
+        df['geometry'] = df.geometry.translate(1000, 1000)
+        df.to_file(path)
+        assert not os.path.exists(path + '.sindex')
+        df = read_file(path)
+        assert df._sindex_file is None
+        assert df.sindex.intersection(tuple(df.total_bounds)) == list(range(5))
+
     @pytest.mark.web
     def test_remote_geojson_url(self):
         url = ("https://raw.githubusercontent.com/geopandas/geopandas/"
@@ -1,25 +1,865 @@
+"""
+Packed, read-only spatial index.
+
+The index is a Sort-Tile-Recursive (STR) packed R-tree built in one go from
+an ``(n, 4)`` array of bounds. All nodes are kept in a single float array,
+level by level (the items first, the root last), and the children of node
+``j`` of a level are the entries ``j * node_capacity`` up to
+``(j + 1) * node_capacity`` of the level below, so no pointers have to be
+stored. Queries walk the tree one level at a time for whole arrays of
+query boxes.
+
+The same arrays can be saved to a file (``SpatialIndex.save``) that is
+memory-mapped on loading, so that several processes can share one index
+read-only. ``read_file`` uses a file saved next to the data file with the
+``.sindex`` suffix (e.g. ``parcels.shp.sindex``) as the spatial index of
+the GeoDataFrame, as long as the size and modification time of the data
+file are those stored in the index file.
+"""
+from collections import namedtuple
+import copy
+import numbers
+import os
+import struct
+
+import numpy as np
+from shapely.geometry.base import BaseGeometry
+
 from geopandas import base
+from geopandas.array import from_shapely, _binary_op, _predicate_pairs
+
+
+Item = namedtuple('Item', ['id', 'object', 'bbox'])
+Item.__doc__ = """\
+Result of ``SpatialIndex.intersection`` with ``objects=True``, with the
+same attributes as the items returned by ``rtree``.
+"""
+
 
-if base.HAS_SINDEX:
-    from rtree.index import Index as RTreeIndex
+def _str_order(bounds, node_capacity):
+    """
+    Sort-Tile-Recursive order of the boxes in ``bounds``: the boxes are
+    sorted on the x value of their center into vertical slices of
+    ``slice_size * node_capacity`` boxes, which are sorted on the y value
+    of their center.
+    """
+    n = len(bounds)
+    if not n:
+        return np.empty(0, dtype='int64')
+    n_leaves = -(-n // node_capacity)
+    n_slices = int(np.ceil(np.sqrt(n_leaves)))
+    slice_size = -(-n_leaves // n_slices) * node_capacity
+    cx = bounds[:, 0] + bounds[:, 2]
+    cy = bounds[:, 1] + bounds[:, 3]
+    x_order = np.argsort(cx, kind='mergesort')
+    slices = np.empty(n, dtype='int64')
+    slices[x_order] = np.arange(n) // slice_size
+    return np.lexsort((cy, slices))
 
 
-class SpatialIndex(RTreeIndex):
+def _build_levels(leaves, node_capacity):
     """
-    A simple wrapper around rtree's RTree Index
+    Offsets of the levels and bounds of all nodes of the tree with the
+    given leaves. Leaves with NaN bounds are ignored in the bounds of their
+    parents.
     """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        child = levels[-1]
+        starts = np.arange(0, len(child), node_capacity)
+        levels.append(np.column_stack([
+            np.fmin.reduceat(child[:, :2], starts),
+            np.fmax.reduceat(child[:, 2:], starts)]))
+    offsets = np.cumsum([0] + [len(level) for level in levels])
+    return offsets, np.concatenate(levels)
+
+
+def _intersects(bounds, query):
+    """
+    Boolean mask of the boxes in ``bounds`` intersecting (or touching) the
+    boxes in ``query``, both arrays of shape ``(n, 4)``.
+    """
+    with np.errstate(invalid='ignore'):
+        return ((bounds[:, 0] <= query[:, 2]) & (bounds[:, 1] <= query[:, 3])
+                & (bounds[:, 2] >= query[:, 0])
+                & (bounds[:, 3] >= query[:, 1]))
+
+
+def _contains_bbox(bounds, other):
+    """
+    Boolean mask of the boxes in ``bounds`` containing the boxes in
+    ``other``, both arrays of shape ``(n, 4)``.
+    """
+    return ((bounds[:, 0] <= other[:, 0]) & (bounds[:, 1] <= other[:, 1])
+            & (bounds[:, 2] >= other[:, 2]) & (bounds[:, 3] >= other[:, 3]))
+
+
+def _box_distances(bounds, query):
+    """
+    Smallest and largest distance between the points of the boxes in
+    ``bounds`` and ``query``, both arrays of shape ``(n, 4)``. They bound
+    the distance between any geometries inside the boxes.
+    """
+    dx = np.maximum(np.maximum(query[:, 0] - bounds[:, 2],
+                               bounds[:, 0] - query[:, 2]), 0)
+    dy = np.maximum(np.maximum(query[:, 1] - bounds[:, 3],
+                               bounds[:, 1] - query[:, 3]), 0)
+    mindist = np.hypot(dx, dy)
+    dx = np.maximum(query[:, 2] - bounds[:, 0], bounds[:, 2] - query[:, 0])
+    dy = np.maximum(query[:, 3] - bounds[:, 1], bounds[:, 3] - query[:, 1])
+    return mindist, np.hypot(dx, dy)
+
+
+def _kth_smallest(group, values, k, n_groups):
+    """
+    The ``k``-th smallest of the ``values`` of each group (inf for groups
+    with less than ``k`` values).
+    """
+    order = np.lexsort((values, group))
+    counts = np.bincount(group, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    out = np.empty(n_groups)
+    out.fill(np.inf)
+    full = counts >= k
+    out[full] = values[order][starts[full] + k - 1]
+    return out
+
+
+def _is_coordinates(value):
+    """Whether ``value`` is an rtree style ``(x, y)`` point or box."""
+    return (isinstance(value, (tuple, list)) and len(value) in (2, 4)
+            and all(isinstance(v, numbers.Number) for v in value))
+
+
+def _box_query(coordinates):
+    """Query array of an rtree style ``(x, y)`` point or box."""
+    coordinates = tuple(coordinates)
+    if len(coordinates) == 2:
+        coordinates = coordinates * 2
+    return np.array([coordinates], dtype=float)
+
+
+def _as_geometry_array(geometries):
+    """GeometryArray and bounds of the query geometries."""
+    if isinstance(geometries, base.GeoPandasBase):
+        # reuse the cached bounds
+        return geometries._geometry_array, geometries._geometry_bounds
+    geometries = from_shapely(geometries)
+    return geometries, geometries.bounds
+
+
+# magic, version, node capacity, number of rows, of items and of levels,
+# size and modification time of the data file (-1 and NaN if unknown)
+_HEADER = struct.Struct('<8sIIqqqqd')
+_MAGIC = b'GPSINDEX'
+_VERSION = 2
+
+SIDECAR_SUFFIX = '.sindex'
+
+
+def _file_stamp(path):
+    """Size and modification time of the file ``path``."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+def _read_header(path):
+    """The fields of the header of the saved index ``path``."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+    if len(header) < 16 or header[:8] != _MAGIC:
+        raise ValueError("{0} is not a saved spatial index".format(path))
+    version = struct.unpack('<I', header[8:12])[0]
+    if version != _VERSION or len(header) < _HEADER.size:
+        raise ValueError("Unsupported spatial index version "
+                         "{0}".format(version))
+    return _HEADER.unpack(header)
+
+
+def _is_sidecar_of(path, source):
+    """
+    Whether the index saved at ``path`` was saved for the current version
+    of the data file ``source`` (same size and modification time).
+    """
+    try:
+        header = _read_header(path)
+    except (IOError, ValueError):
+        return False
+    return tuple(header[-2:]) == _file_stamp(source)
+
+
+# predicates supported by query_bulk; except for 'dwithin' (whose query
+# boxes are enlarged by the distance), all of them are False for geometries
+# with non-intersecting bounding boxes
+VALID_QUERY_PREDICATES = (None, 'intersects', 'within', 'contains',
+                          'overlaps', 'crosses', 'touches', 'covers',
+                          'covered_by', 'dwithin')
+
+# predicate(a, b) == INVERSE_PREDICATES[predicate](b, a)
+INVERSE_PREDICATES = {
+    'intersects': 'intersects',
+    'within': 'contains',
+    'contains': 'within',
+    'overlaps': 'overlaps',
+    'crosses': 'crosses',
+    'touches': 'touches',
+    'covers': 'covered_by',
+    'covered_by': 'covers',
+    'dwithin': 'dwithin',
+}
+
+
+class SpatialIndex(object):
+    """
+    Packed R-tree on the bounds of the geometries of a GeoSeries or
+    GeoDataFrame.
+
+    The tree is bulk loaded with the Sort-Tile-Recursive algorithm and
+    cannot be modified afterwards. Rows appended with ``append`` are held
+    in a second, small tree until they are merged into the main tree with
+    ``compact``.
+
+    Parameters
+    ----------
+    bounds : array-like
+        Float array of shape ``(n, 4)`` with the ``minx, miny, maxx, maxy``
+        bounds of each geometry. Rows with NaN values (missing or empty
+        geometries) are not indexed.
+    objects : array-like, optional
+        Object stored with each row (e.g. the index labels), returned by
+        ``intersection`` with ``objects=True``. Defaults to the positions.
+    node_capacity : int, default 16
+        Maximum number of children of a node.
+    geometries : GeometryArray, optional
+        The indexed geometries, needed to refine the results of
+        ``query_bulk`` with a predicate.
+    """
+
+    def __init__(self, bounds, objects=None, node_capacity=16,
+                 geometries=None):
+        bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        if node_capacity < 2:
+            raise ValueError("node_capacity should be at least 2")
+        self.node_capacity = node_capacity
+        self.objects = objects
+        self.geometries = geometries
+        self._n_rows = len(bounds)
+        valid = np.flatnonzero(~np.isnan(bounds).any(axis=1))
+
+        # positions of the items, in the order of the leaves of the tree
+        order = _str_order(bounds[valid], node_capacity)
+        self._ids = valid[order]
+        self._size = len(self._ids)
+        self._offsets, self._nodes = _build_levels(bounds[self._ids],
+                                                   node_capacity)
 
-    def __init__(self, *args):
-        if not base.HAS_SINDEX:
-            raise ImportError("SpatialIndex needs `rtree`")
-        RTreeIndex.__init__(self, *args)
+    _leaf_positions = None
+    # tree of the appended rows
+    _delta = None
+    # the delta tree is merged when it holds more than this fraction of the
+    # geometries of the main tree
+    max_delta_fraction = 0.25
+    # number of query boxes searched at once: the temporary (query, node)
+    # pairs of a level grow with the number of queries, not only with the
+    # number of matches
+    query_batch_size = 65536
+
+    def __len__(self):
+        return self.size
 
     @property
     def size(self):
-        return len(self.leaves()[0][1])
+        """Number of indexed geometries."""
+        if self._delta is not None:
+            return self._size + self._delta.size
+        return self._size
 
     @property
     def is_empty(self):
-        if len(self.leaves()) > 1:
-            return False
         return self.size < 1
+
+    @property
+    def bounds(self):
+        """Bounds ``[minx, miny, maxx, maxy]`` of all indexed geometries."""
+        if self.is_empty:
+            return np.array([np.nan] * 4)
+        roots = np.array([tree._nodes[-1] for tree in self._trees()
+                          if tree._size > 0])
+        return np.concatenate([np.nanmin(roots[:, :2], axis=0),
+                               np.nanmax(roots[:, 2:], axis=0)])
+
+    def _trees(self):
+        """The main tree and, if rows were appended, the delta tree."""
+        if self._delta is None:
+            return [self]
+        return [self, self._delta]
+
+    def _level(self, k):
+        return self._nodes[self._offsets[k]:self._offsets[k + 1]]
+
+    def _query(self, query):
+        """
+        Pairs of the position of the query box and the position of the
+        indexed geometry for all intersecting boxes (in no particular
+        order).
+        """
+        input_idx, tree_idx = [], []
+        for start in range(0, len(query), self.query_batch_size):
+            batch = query[start:start + self.query_batch_size]
+            for tree in self._trees():
+                batch_idx, batch_tree_idx = tree._query_tree(batch)
+                input_idx.append(batch_idx + start)
+                tree_idx.append(batch_tree_idx)
+        if not input_idx:
+            return (np.empty(0, dtype='int64'), np.empty(0, dtype='int64'))
+        return np.concatenate(input_idx), np.concatenate(tree_idx)
+
+    def _query_tree(self, query):
+        """``_query`` for the main tree only."""
+        if self._size < 1 or not len(query):
+            return (np.empty(0, dtype='int64'), np.empty(0, dtype='int64'))
+
+        n_levels = len(self._offsets) - 1
+        # (query, node) pairs of the root level, which has a single node
+        input_idx = np.arange(len(query))
+        node_idx = np.zeros(len(query), dtype='int64')
+        keep = _intersects(self._level(n_levels - 1)[node_idx], query)
+        input_idx, node_idx = input_idx[keep], node_idx[keep]
+
+        cap = self.node_capacity
+        for k in range(n_levels - 2, -1, -1):
+            level = self._level(k)
+            # expand every pair to the children of its node
+            input_idx = np.repeat(input_idx, cap)
+            node_idx = (np.repeat(node_idx * cap, cap) +
+                        np.tile(np.arange(cap), len(node_idx)))
+            keep = node_idx < len(level)
+            input_idx, node_idx = input_idx[keep], node_idx[keep]
+            keep = _intersects(level[node_idx], query[input_idx])
+            input_idx, node_idx = input_idx[keep], node_idx[keep]
+        return input_idx, self._ids[node_idx]
+
+    def intersection_bulk(self, bounds):
+        """
+        Find the indexed geometries whose bounds intersect each of the
+        query boxes.
+
+        Parameters
+        ----------
+        bounds : array-like
+            Float array of shape ``(m, 4)`` with the query boxes. Boxes with
+            NaN values have no matches.
+
+        Returns
+        -------
+        input_idx, tree_idx : ndarray
+            Integer arrays of the same length, with the position of the
+            query box and the position in the indexed GeoSeries of each
+            match, sorted by ``input_idx`` and then ``tree_idx``.
+        """
+        query = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        input_idx, tree_idx = self._query(query)
+        order = np.lexsort((tree_idx, input_idx))
+        return input_idx[order], tree_idx[order]
+
+    def intersection(self, coordinates, objects=False):
+        """
+        Find the indexed geometries whose bounds intersect a box, in the
+        same way as ``rtree.index.Index.intersection``.
+
+        Parameters
+        ----------
+        coordinates : sequence
+            ``(minx, miny, maxx, maxy)`` box or ``(x, y)`` point.
+        objects : bool or 'raw', default False
+            If False, the positions of the matching geometries are
+            returned. If True, ``Item`` objects with the position (``id``),
+            the stored object and the bounds of each match; if 'raw', the
+            stored objects only.
+        """
+        query = _box_query(coordinates)
+        tree_idx = np.sort(self._query(query)[1])
+        return self._items(tree_idx, objects)
+
+    def count(self, coordinates):
+        """
+        Number of indexed geometries whose bounds intersect a box, in the
+        same way as ``rtree.index.Index.count``.
+        """
+        return len(self._query(_box_query(coordinates))[1])
+
+    def _items(self, tree_idx, objects):
+        """Result of an rtree style query (see ``intersection``)."""
+        if not objects:
+            return tree_idx.tolist()
+        values = (tree_idx if self.objects is None
+                  else np.asarray(self.objects)[tree_idx]).tolist()
+        if objects == 'raw':
+            return values
+        bboxes = self._leaf_bounds(tree_idx).tolist()
+        return [Item(i, obj, bbox)
+                for i, obj, bbox in zip(tree_idx.tolist(), values, bboxes)]
+
+    def query_bulk(self, geometries, predicate=None, distance=None):
+        """
+        Find the indexed geometries for which ``predicate(input, tree)``
+        holds, for each of the input geometries.
+
+        The candidates are found with the bounding boxes in the tree and
+        then refined with the exact predicate. The geometries of the side
+        with the fewest distinct geometries among the candidate pairs (e.g.
+        a few large polygons tested against many points) are prepared once
+        for all their candidates.
+
+        Parameters
+        ----------
+        geometries : GeoSeries, GeometryArray or sequence of geometries
+        predicate : str, optional
+            One of ``'intersects'``, ``'within'``, ``'contains'``,
+            ``'overlaps'``, ``'crosses'``, ``'touches'``, ``'covers'``,
+            ``'covered_by'`` or ``'dwithin'``. ``'contains'`` e.g. selects
+            the tree geometries contained in the input geometry, and
+            ``'dwithin'`` the tree geometries within ``distance`` of the
+            input geometry. If None, the pairs with intersecting bounding
+            boxes are returned.
+        distance : float, optional
+            The distance for the ``'dwithin'`` predicate.
+
+        Returns
+        -------
+        input_idx, tree_idx : ndarray
+            Integer arrays of the same length, with the position of the
+            input geometry and the position in the indexed GeoSeries of
+            each match, sorted by ``input_idx`` and then ``tree_idx``.
+        """
+        if predicate not in VALID_QUERY_PREDICATES:
+            raise ValueError("Got `predicate` = `{0}`; `predicate` must be "
+                             "one of {1}".format(predicate,
+                                                 VALID_QUERY_PREDICATES))
+        if (predicate == 'dwithin') != (distance is not None):
+            raise ValueError("`distance` is required for the 'dwithin' "
+                             "predicate, and only valid for it")
+        if distance is not None and not distance >= 0:
+            raise ValueError("`distance` should be a non-negative number")
+        geometries, bounds = _as_geometry_array(geometries)
+        if predicate == 'dwithin':
+            return self._query_dwithin(geometries, bounds, distance)
+        input_idx, tree_idx = self.intersection_bulk(bounds)
+        if predicate is None or not len(input_idx):
+            return input_idx, tree_idx
+        self._check_geometries()
+
+        # cheaper filter on the bounding boxes first
+        if predicate in ('contains', 'within', 'covers', 'covered_by'):
+            tree_bounds = self._leaf_bounds(tree_idx)
+            if predicate in ('contains', 'covers'):
+                keep = _contains_bbox(bounds[input_idx], tree_bounds)
+            else:
+                keep = _contains_bbox(tree_bounds, bounds[input_idx])
+            input_idx, tree_idx = input_idx[keep], tree_idx[keep]
+
+        # shapely has no (prepared) covered_by, it is tested as covers on
+        # the pairs grouped by indexed geometry
+        if predicate == 'covered_by' or (
+                predicate != 'covers' and
+                len(np.unique(tree_idx)) < len(np.unique(input_idx))):
+            # test the pairs grouped by indexed geometry
+            order = np.lexsort((input_idx, tree_idx))
+            keep = np.empty(len(order), dtype=bool)
+            keep[order] = _predicate_pairs(INVERSE_PREDICATES[predicate],
+                                           self.geometries, geometries,
+                                           tree_idx[order], input_idx[order])
+        else:
+            keep = _predicate_pairs(predicate, geometries, self.geometries,
+                                    input_idx, tree_idx)
+        return input_idx[keep], tree_idx[keep]
+
+    def _query_dwithin(self, geometries, bounds, distance):
+        """``query_bulk`` for the 'dwithin' predicate."""
+        query = bounds + np.array([-distance, -distance, distance, distance])
+        input_idx, tree_idx = self.intersection_bulk(query)
+        if not len(input_idx):
+            return input_idx, tree_idx
+        self._check_geometries()
+        # the corners of the enlarged boxes are farther than distance
+        mindist, _ = _box_distances(self._leaf_bounds(tree_idx),
+                                    bounds[input_idx])
+        keep = mindist <= distance
+        input_idx, tree_idx = input_idx[keep], tree_idx[keep]
+        distances = _binary_op('distance', geometries.take(input_idx),
+                               self.geometries.take(tree_idx))
+        keep = distances <= distance
+        return input_idx[keep], tree_idx[keep]
+
+    def nearest(self, geometries, k=1, max_distance=None,
+                return_distance=True, objects=False):
+        """
+        Find the ``k`` nearest indexed geometries of each of the input
+        geometries.
+
+        As with ``rtree.index.Index.nearest``, ``geometries`` can also be a
+        single ``(minx, miny, maxx, maxy)`` box or ``(x, y)`` point: the
+        ``k`` indexed geometries with the nearest bounds (and those at the
+        same distance as the ``k``-th one) are then returned as a list, in
+        the format given by ``objects`` (see ``intersection``).
+
+        The tree is searched one level at a time for all inputs at once
+        (in batches of ``query_batch_size`` inputs):
+        nodes that are farther away (based on the bounding boxes) than the
+        ``k``-th nearest node can possibly be are pruned, and the distances
+        to the remaining geometries are computed exactly.
+
+        Parameters
+        ----------
+        geometries : GeoSeries, GeometryArray or sequence of geometries
+        k : int, default 1
+            Number of neighbours to find for each input geometry. Of
+            geometries at equal distance, the first ones in the indexed
+            GeoSeries are returned.
+        max_distance : float, optional
+            Only return neighbours within this distance.
+        return_distance : bool, default True
+            Also return the distance of each match.
+
+        Returns
+        -------
+        input_idx, tree_idx : ndarray
+            Integer arrays of the same length, with the position of the
+            input geometry and the position in the indexed GeoSeries of
+            each match, sorted by ``input_idx`` and then distance. Missing
+            and empty input geometries have no matches.
+        distances : ndarray
+            Float array with the distance of each match, only returned if
+            ``return_distance`` is True.
+        """
+        if k < 1:
+            raise ValueError("k should be a positive integer")
+        if max_distance is not None and max_distance < 0:
+            raise ValueError("max_distance should not be negative")
+        if _is_coordinates(geometries):
+            return self._nearest_box(_box_query(geometries), k, objects)
+        self._check_geometries()
+        geometries, query = _as_geometry_array(geometries)
+        results = []
+        for start in range(0, len(query), self.query_batch_size):
+            stop = start + self.query_batch_size
+            input_idx, tree_idx, distances = self._nearest_batch(
+                geometries[start:stop], query[start:stop], k, max_distance)
+            results.append((input_idx + start, tree_idx, distances))
+        if results:
+            input_idx, tree_idx, distances = (np.concatenate(arrays)
+                                              for arrays in zip(*results))
+        else:
+            input_idx = tree_idx = np.empty(0, dtype='int64')
+            distances = np.empty(0, dtype=float)
+        if return_distance:
+            return input_idx, tree_idx, distances
+        return input_idx, tree_idx
+
+    def _nearest_box(self, query, k, objects):
+        """Rtree style ``nearest`` for a single query box."""
+        tree_idx = np.concatenate([tree._nearest_candidates(query, k, None)[1]
+                                   for tree in self._trees()])
+        distances = _box_distances(self._leaf_bounds(tree_idx), query)[0]
+        if len(distances) > k:
+            # ties with the k-th nearest are kept
+            keep = distances <= np.sort(distances)[k - 1]
+            tree_idx, distances = tree_idx[keep], distances[keep]
+        order = np.lexsort((tree_idx, distances))
+        return self._items(tree_idx[order], objects)
+
+    def _nearest_batch(self, geometries, query, k, max_distance):
+        """``nearest`` for a batch of query geometries and their bounds."""
+        pairs = [tree._nearest_candidates(query, k, max_distance)
+                 for tree in self._trees()]
+        input_idx, tree_idx = (np.concatenate(arrays)
+                               for arrays in zip(*pairs))
+        distances = _binary_op('distance', geometries.take(input_idx),
+                               self.geometries.take(tree_idx))
+        if max_distance is not None:
+            keep = distances <= max_distance
+            input_idx = input_idx[keep]
+            tree_idx = tree_idx[keep]
+            distances = distances[keep]
+
+        # the k nearest of each input
+        order = np.lexsort((tree_idx, distances, input_idx))
+        input_idx = input_idx[order]
+        counts = np.bincount(input_idx, minlength=len(query))
+        rank = np.arange(len(input_idx)) - (np.cumsum(counts) -
+                                            counts)[input_idx]
+        order = order[rank < k]
+        return input_idx[rank < k], tree_idx[order], distances[order]
+
+    def _nearest_candidates(self, query, k, max_distance):
+        """
+        Pairs of the position of the query box and the position of the
+        geometry of the main tree that can be among the ``k`` nearest
+        neighbours.
+        """
+        input_idx = np.flatnonzero(~np.isnan(query).any(axis=1))
+        if self._size < 1 or not len(input_idx):
+            return (np.empty(0, dtype='int64'), np.empty(0, dtype='int64'))
+        n_levels = len(self._offsets) - 1
+        node_idx = np.zeros(len(input_idx), dtype='int64')
+        cap = self.node_capacity
+        for k_level in range(n_levels - 1, -1, -1):
+            level = self._level(k_level)
+            if k_level < n_levels - 1:
+                # expand every pair to the children of its node
+                input_idx = np.repeat(input_idx, cap)
+                node_idx = (np.repeat(node_idx * cap, cap) +
+                            np.tile(np.arange(cap), len(node_idx)))
+                keep = node_idx < len(level)
+                input_idx, node_idx = input_idx[keep], node_idx[keep]
+            mindist, maxdist = _box_distances(level[node_idx],
+                                              query[input_idx])
+            # nodes without geometries (in a subset) have NaN bounds
+            keep = ~np.isnan(maxdist)
+            input_idx, node_idx = input_idx[keep], node_idx[keep]
+            mindist, maxdist = mindist[keep], maxdist[keep]
+            # every node holds at least one geometry, so the k-th smallest
+            # largest distance bounds the distance of the k-th neighbour
+            limit = _kth_smallest(input_idx, maxdist, k, len(query))
+            keep = mindist <= limit[input_idx]
+            if max_distance is not None:
+                keep &= mindist <= max_distance
+            input_idx, node_idx = input_idx[keep], node_idx[keep]
+        return input_idx, self._ids[node_idx]
+
+    def query(self, geometry, predicate=None, distance=None):
+        """
+        Find the indexed geometries for which ``predicate(geometry, tree)``
+        holds (see ``query_bulk``).
+
+        Returns
+        -------
+        ndarray
+            Sorted positions in the indexed GeoSeries of the matches.
+        """
+        if not isinstance(geometry, BaseGeometry):
+            raise TypeError("'geometry' should be a shapely geometry")
+        return self.query_bulk([geometry], predicate=predicate,
+                               distance=distance)[1]
+
+    def save(self, path, source=None):
+        """
+        Save the index to a file, which can be memory-mapped with ``load``.
+
+        The stored objects and geometries are not saved. Save the index as
+        ``<data file>.sindex`` to have ``read_file`` use it when reading
+        the (unchanged) data file.
+
+        Parameters
+        ----------
+        path : str
+        source : str, optional
+            The data file the geometries were read from. Its size and
+            modification time are stored, and ``read_file`` ignores the
+            index once the data file is modified. Defaults to ``path``
+            without the ``.sindex`` suffix, if that file exists.
+        """
+        if source is None and path.endswith(SIDECAR_SUFFIX):
+            source = path[:-len(SIDECAR_SUFFIX)]
+            if not os.path.isfile(source):
+                source = None
+        size, mtime = (-1, np.nan) if source is None else _file_stamp(source)
+        self.compact()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.node_capacity,
+                                 self._n_rows, len(self._ids),
+                                 len(self._offsets) - 1, size, mtime))
+            f.write(np.ascontiguousarray(self._offsets, '<i8').tobytes())
+            f.write(np.ascontiguousarray(self._ids, '<i8').tobytes())
+            f.write(np.ascontiguousarray(self._nodes, '<f8').tobytes())
+
+    @classmethod
+    def load(cls, path, objects=None, geometries=None, mmap=True):
+        """
+        Load an index saved with ``save``.
+
+        Parameters
+        ----------
+        path : str
+        objects : array-like, optional
+            Object stored with each row (see ``SpatialIndex``).
+        geometries : GeometryArray, optional
+            The indexed geometries, in the same order as when the index was
+            built.
+        mmap : bool, default True
+            Memory-map the file read-only instead of reading it in memory.
+            The pages of the file are then shared by all processes using
+            it.
+        """
+        (_, _, node_capacity, n_rows, n_items, n_levels, _,
+         _) = _read_header(path)
+        if geometries is not None and len(geometries) != n_rows:
+            raise ValueError("The spatial index was built for {0} "
+                             "geometries, got {1}".format(n_rows,
+                                                          len(geometries)))
+
+        def read(offset, dtype, count):
+            if not count:
+                return np.empty(0, dtype=dtype)
+            if mmap:
+                return np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                 shape=(count,))
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                return np.fromfile(f, dtype=dtype, count=count)
+
+        offset = _HEADER.size
+        offsets = read(offset, '<i8', n_levels + 1)
+        offset += 8 * (n_levels + 1)
+        ids = read(offset, '<i8', n_items)
+        offset += 8 * n_items
+        nodes = read(offset, '<f8', 4 * int(offsets[-1]))
+
+        self = cls.__new__(cls)
+        self.node_capacity = node_capacity
+        self.objects = objects
+        self.geometries = geometries
+        self._n_rows = n_rows
+        self._offsets = offsets
+        self._ids = ids
+        self._size = int(np.count_nonzero(ids >= 0))
+        self._nodes = nodes.reshape(-1, 4)
+        return self
+
+    def _subset(self, positions, objects=None, geometries=None):
+        """
+        Index of the geometries at ``positions`` (unique positions of the
+        indexed rows, e.g. a selection or a reordering of them), or of the
+        same geometries if ``positions`` is None, with new objects and
+        geometries.
+
+        The tree arrays are shared or remapped: the leaves of the geometries
+        that are not selected are blanked out and only the bounds of the
+        upper levels are recomputed, so nothing needs to be sorted again.
+        Returns None if it is cheaper to build a new index.
+        """
+        new = copy.copy(self)
+        new.objects = objects
+        new.geometries = geometries
+        if positions is None:
+            return new
+        positions = np.asarray(positions, dtype='int64')
+        # small subsets are cheaper to query with a new tree
+        if 4 * len(positions) < self.size:
+            return None
+        new_positions = np.empty(self._n_rows, dtype='int64')
+        new_positions.fill(-1)
+        new_positions[positions] = np.arange(len(positions))
+        if np.count_nonzero(new_positions >= 0) < len(positions):
+            # repeated rows
+            return None
+        new._remap(new_positions, len(positions))
+        if new._delta is not None:
+            new._delta = copy.copy(new._delta)
+            new._delta._remap(new_positions, len(positions))
+        return new
+
+    def _remap(self, new_positions, n_rows):
+        """
+        Replace the positions of the input by ``new_positions`` (-1 for
+        removed rows) in this tree, recomputing the upper levels.
+        """
+        live = self._ids >= 0
+        ids = np.where(live, new_positions[np.where(live, self._ids, 0)],
+                       -1)
+        leaves = np.array(self._level(0))
+        leaves[ids < 0] = np.nan
+        self._ids = ids
+        self._size = int(np.count_nonzero(ids >= 0))
+        self._n_rows = n_rows
+        self._offsets, self._nodes = _build_levels(leaves, self.node_capacity)
+        self._leaf_positions = None
+
+    def append(self, bounds, objects=None, geometries=None):
+        """
+        Index with the geometries with ``bounds`` added after the indexed
+        geometries.
+
+        The main tree is shared with this index; the appended geometries
+        are put in a separate, small tree that is rebuilt on every append.
+        When it grows larger than ``max_delta_fraction`` of the main tree,
+        both are merged (see ``compact``), so a sequence of small appends
+        does not rebuild the whole index each time.
+
+        Parameters
+        ----------
+        bounds : array-like of shape (n, 4)
+            Bounds of the appended geometries.
+        objects, geometries : array-like, optional
+            The objects and geometries of all (indexed and appended) rows.
+
+        Returns
+        -------
+        SpatialIndex
+        """
+        bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        new = copy.copy(self)
+        new.objects = objects
+        new.geometries = geometries
+        new._n_rows = self._n_rows + len(bounds)
+        new._leaf_positions = None
+        # the rows of the current delta tree and the appended rows
+        rows = np.arange(self._n_rows, new._n_rows)
+        if self._delta is not None:
+            live = np.flatnonzero(self._delta._ids >= 0)
+            rows = np.concatenate([self._delta._ids[live], rows])
+            bounds = np.concatenate([self._delta._level(0)[live], bounds])
+        delta = SpatialIndex(bounds, node_capacity=self.node_capacity)
+        delta._ids = np.where(delta._ids >= 0,
+                              rows[np.maximum(delta._ids, 0)], -1)
+        delta._n_rows = new._n_rows
+        new._delta = delta
+        if delta.size > self.max_delta_fraction * max(self._size, 1):
+            new.compact()
+        return new
+
+    def compact(self):
+        """
+        Merge the geometries added with ``append`` into the main tree.
+        """
+        if self._delta is None:
+            return
+        leaves = np.empty((self._n_rows, 4))
+        leaves.fill(np.nan)
+        for tree in self._trees():
+            live = np.flatnonzero(tree._ids >= 0)
+            leaves[tree._ids[live]] = tree._level(0)[live]
+        tree = SpatialIndex(leaves, node_capacity=self.node_capacity)
+        self._ids = tree._ids
+        self._size = tree._size
+        self._offsets = tree._offsets
+        self._nodes = tree._nodes
+        self._delta = None
+        self._leaf_positions = None
+
+    def _check_geometries(self):
+        if self.geometries is None:
+            raise ValueError("The indexed geometries are needed for exact "
+                             "results, but were not given to the index")
+
+    def _leaf_bounds(self, tree_idx):
+        """Bounds of the indexed geometries at positions ``tree_idx``."""
+        if self._leaf_positions is None:
+            # position in the leaf levels (of the main tree, followed by
+            # the delta tree) of each position of the input
+            positions = np.zeros(self._n_rows, dtype='int64')
+            start = 0
+            for tree in self._trees():
+                live = np.flatnonzero(tree._ids >= 0)
+                positions[tree._ids[live]] = live + start
+                start += len(tree._ids)
+            self._leaf_positions = positions
+        positions = self._leaf_positions[tree_idx]
+        if self._delta is None:
+            return self._level(0)[positions]
+        n_main = len(self._ids)
+        in_delta = positions >= n_main
+        bounds = np.empty((len(positions), 4))
+        bounds[~in_delta] = self._level(0)[positions[~in_delta]]
+        bounds[in_delta] = self._delta._level(0)[positions[in_delta] - n_main]
+        return bounds
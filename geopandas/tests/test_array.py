@@ -0,0 +1,237 @@
+from __future__ import absolute_import
+
+import numpy as np
+import shapely.affinity
+from shapely.geometry import (
+    GeometryCollection, LinearRing, LineString, MultiPoint, MultiPolygon,
+    Point, Polygon)
+from shapely.geometry.base import BaseGeometry
+
+from geopandas import GeoSeries, GeoDataFrame
+from geopandas.array import (
+    GeometryArray, from_shapely, _affine_transform, _binary_geo, _binary_op,
+    _binary_predicate, _predicate_pairs, _unary_geo, _unary_geo_per_row,
+    _unary_op)
+
+import pytest
+from numpy.testing import assert_array_equal
+
+
+T = Polygon([(0, 0), (1, 0), (1, 1)])
+SQ = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+POINTS = [Point(i, i) for i in range(10)]
+
+
+def test_from_shapely():
+    arr = from_shapely(POINTS + [None, np.nan])
+    assert isinstance(arr, GeometryArray)
+    assert len(arr) == 12
+    assert arr.data.dtype == object
+    assert arr[0] == Point(0, 0)
+    assert arr[10] is None
+    assert arr[11] is None
+    assert_array_equal(arr.isna(), [False] * 10 + [True, True])
+
+
+def test_from_shapely_multipart():
+    # multi-part geometries should not be unpacked
+    mp = [MultiPoint([(0, 0), (1, 1)]), MultiPoint([(2, 2), (3, 3)])]
+    arr = from_shapely(mp)
+    assert arr.data.shape == (2,)
+    assert arr[1].equals(mp[1])
+
+
+def test_from_shapely_invalid():
+    with pytest.raises(TypeError):
+        from_shapely([Point(0, 0), 'POINT (0 0)'])
+
+
+def test_constructor_checks():
+    with pytest.raises(TypeError):
+        GeometryArray(POINTS)
+    with pytest.raises(ValueError):
+        GeometryArray(np.empty((2, 2), dtype=object))
+
+
+def test_getitem_take_copy():
+    arr = from_shapely(POINTS)
+    assert isinstance(arr[2:5], GeometryArray)
+    assert len(arr[arr.isna()]) == 0
+    taken = arr.take([0, 5])
+    assert list(taken) == [POINTS[0], POINTS[5]]
+    filled = arr.take([0, -1], allow_fill=True)
+    assert filled[1] is None
+    copied = arr.copy()
+    copied[0] = None
+    assert arr[0] is POINTS[0]
+
+
+def test_take_empty():
+    arr = from_shapely([])
+    filled = arr.take([-1, -1], allow_fill=True)
+    assert list(filled) == [None, None]
+    filled = arr.take([-1], allow_fill=True, fill_value=SQ)
+    assert filled[0] is SQ
+    assert len(arr.take([], allow_fill=True)) == 0
+    with pytest.raises(IndexError):
+        arr.take([0, -1], allow_fill=True)
+
+
+def test_concat():
+    arr = GeometryArray._concat_same_type([from_shapely(POINTS[:3]),
+                                           from_shapely(POINTS[3:])])
+    assert list(arr) == POINTS
+
+
+def test_unary_ops():
+    arr = from_shapely([T, SQ, None])
+    assert_array_equal(_unary_op('area', arr, null_value=np.nan),
+                       [0.5, 1.0, np.nan])
+    res = _unary_op('geom_type', arr, null_value=None)
+    assert res.dtype == object
+    assert list(res) == ['Polygon', 'Polygon', None]
+    res = _unary_geo('centroid', arr)
+    assert isinstance(res, GeometryArray)
+    assert res[1].equals(Point(0.5, 0.5))
+    assert res[2] is None
+
+    # NaN is missing as well
+    arr = GeometryArray(np.array([T, np.nan], dtype=object))
+    res = _unary_geo('centroid', arr)
+    assert res[0].equals(T.centroid)
+    assert res[1] is None
+    res = _unary_geo_per_row('buffer', arr, [1.0, 2.0])
+    assert res[0].equals(T.buffer(1.0))
+    assert res[1] is None
+    assert np.isnan(arr.bounds[1]).all()
+
+
+def test_binary_ops():
+    left = from_shapely([T, SQ, Polygon()])
+    right = from_shapely([SQ, T, SQ])
+    assert_array_equal(_binary_predicate('contains', left, right),
+                       [False, True, False])
+    with_missing = from_shapely([T, SQ, None])
+    assert_array_equal(_binary_predicate('intersects', with_missing,
+                                  Point(0.9, 0.1)),
+                       [True, True, False])
+    assert_array_equal(_binary_op('distance', with_missing, Point(2, 0)),
+                       [1.0, 1.0, np.nan])
+    res = _binary_geo('intersection', left, right)
+    assert isinstance(res, GeometryArray)
+    assert res[0].equals(T)
+    with pytest.raises(ValueError):
+        _binary_predicate('contains', left, right[:2])
+
+
+def test_geoseries_from_geometry_array():
+    arr = from_shapely(POINTS)
+    s = GeoSeries(arr, crs={'init': 'epsg:4326'})
+    assert len(s) == 10
+    assert s.crs == {'init': 'epsg:4326'}
+    assert isinstance(s._geometry_array, GeometryArray)
+    # no copy of the underlying array
+    assert s._geometry_array.data is s.values
+
+    df = GeoDataFrame({'a': range(10)}, geometry=arr)
+    assert isinstance(df._geometry_array, GeometryArray)
+    assert all(isinstance(g, BaseGeometry) for g in df._geometry_array)
+
+
+def test_binary_predicate_null_or_empty():
+    left = from_shapely([T, None, Polygon(), SQ])
+    res = _binary_predicate('intersects', left, SQ)
+    assert res.dtype == bool
+    assert_array_equal(res, [True, False, False, True])
+    # an empty scalar never matches
+    assert not _binary_predicate('intersects', left, Polygon()).any()
+    assert_array_equal(_binary_op('distance', left, Point(2, 0)),
+                       [1.0, np.nan, np.nan, 1.0])
+    # keyword arguments are passed through
+    res = _binary_predicate('equals_exact', left, T, tolerance=0.1)
+    assert_array_equal(res, [True, False, False, False])
+    # empty geometries are treated as missing for all predicates
+    assert_array_equal(_binary_predicate('disjoint', left, Point(5, 5)),
+                       [True, False, False, True])
+    assert_array_equal(_binary_predicate('equals', left, left),
+                       [True, False, False, True])
+
+
+@pytest.mark.parametrize('op', ['intersects', 'disjoint', 'touches',
+                                'overlaps', 'contains', 'within'])
+def test_binary_predicate_prepared(op):
+    # the scalar case uses a prepared geometry with the inverse predicate,
+    # results should equal the element-wise evaluation
+    geoms = [T, SQ, Point(0.5, 0.5), Point(1, 1), Point(3, 3), None,
+             Polygon([(0.5, 0.5), (2, 0.5), (2, 2)]),
+             Polygon([(0.2, 0.1), (0.3, 0.1), (0.3, 0.2)])]
+    left = from_shapely(geoms)
+    for other in [SQ, T, Point(0.5, 0.5)]:
+        expected = [getattr(g, op)(other) if g is not None else False
+                    for g in geoms]
+        assert_array_equal(_binary_predicate(op, left, other), expected)
+        repeated = from_shapely([other] * len(geoms))
+        assert_array_equal(_binary_predicate(op, left, repeated), expected)
+
+
+def test_predicate_pairs():
+    left = from_shapely([SQ, Point(0.5, 0.5), T])
+    right = from_shapely([Point(0.2, 0.1), Point(5, 5), SQ])
+    left_idx = np.array([0, 0, 0, 1, 2])
+    right_idx = np.array([0, 1, 2, 2, 0])
+    for op in ['intersects', 'contains', 'within', 'touches']:
+        expected = [getattr(left.data[i], op)(right.data[j])
+                    for i, j in zip(left_idx, right_idx)]
+        assert_array_equal(_predicate_pairs(op, left, right, left_idx,
+                                            right_idx), expected)
+    assert len(_predicate_pairs('intersects', left, right, left_idx[:0],
+                                right_idx[:0])) == 0
+
+
+MIXED = [Point(1, 2), Point(1, 2, 3), LineString([(0, 0), (1, 1), (2, 0)]),
+         Polygon([(0, 0), (10, 0), (10, 10), (0, 10)],
+                 [[(1, 1), (2, 1), (2, 2)]]),
+         MultiPolygon([SQ, Polygon([(5, 5), (6, 5), (6, 6)])]),
+         GeometryCollection([Point(-5, 3), LineString([(0, 0), (1, 9)])]),
+         LinearRing([(0, 0), (1, 0), (1, 1)]), None, Polygon(), Point()]
+
+
+def test_bounds():
+    bounds = from_shapely(MIXED).bounds
+    assert bounds.shape == (len(MIXED), 4)
+    for geom, b in zip(MIXED, bounds):
+        if geom is None or geom.is_empty:
+            assert np.isnan(b).all()
+        else:
+            assert tuple(b) == geom.bounds
+    assert from_shapely([]).bounds.shape == (0, 4)
+
+
+def test_affine_transform():
+    matrix = [1.5, 0.2, 0.3, 0.9, 10, -3]
+    res = _affine_transform(from_shapely(MIXED), matrix)
+    assert isinstance(res, GeometryArray)
+    for geom, r in zip(MIXED, res):
+        if geom is None or geom.is_empty:
+            assert r is geom
+            continue
+        assert r.geom_type == geom.geom_type
+        assert r.has_z == geom.has_z
+        expected = shapely.affinity.affine_transform(geom, matrix)
+        assert r.equals_exact(expected, 0)
+    # z coordinates of 3D geometries
+    res = _affine_transform(from_shapely([Point(1, 2, 3)]),
+                            [1, 0, 1, 0, 1, 1, 0, 0, 2, 1, 2, 3])
+    assert res[0].coords[:] == [(5, 7, 9)]
+
+
+def test_affine_transform_per_row():
+    arr = from_shapely([Point(0, 0), None, T])
+    res = _affine_transform(arr, [[1, 0, 0, 1, 1, 0],
+                                  [np.nan] * 6,
+                                  [2, 0, 0, 2, 0, 1]])
+    assert res[0].equals(Point(1, 0))
+    assert res[1] is None
+    assert res[2].equals(Polygon([(0, 1), (2, 1), (2, 3)]))
+    with pytest.raises(ValueError):
+        _affine_transform(arr, [[1, 0, 0, 1, 1, 0]] * 2)
@@ -0,0 +1,90 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pyproj
+from shapely.geometry import Point
+
+from geopandas import GeoDataFrame, GeoSeries
+from geopandas.crs import TransformerCache, transformer_cache
+from geopandas.tests.util import RecordingExecutor
+
+import pytest
+
+
+WGS84 = {'init': 'epsg:4326', 'no_defs': True}
+UTM18N = {'init': 'epsg:26918', 'no_defs': True}
+
+
+def test_transformer():
+    transformer = TransformerCache().get(WGS84, UTM18N)
+    x, y = np.array([-74.0, -73.5]), np.array([40.7, 40.8])
+    proj_in = pyproj.Proj(WGS84, preserve_units=True)
+    proj_out = pyproj.Proj(UTM18N, preserve_units=True)
+    expected = pyproj.transform(proj_in, proj_out, x, y)
+    np.testing.assert_allclose(transformer.transform(x, y), expected)
+    res = transformer.transform(x, y, np.array([10.0, 20.0]))
+    assert len(res) == 3
+
+
+def test_cache_hits_and_eviction():
+    cache = TransformerCache(maxsize=2)
+    first = cache.get(WGS84, UTM18N)
+    # keys are normalized
+    assert cache.get({'no_defs': True, 'init': 'epsg:4326'}, UTM18N) is first
+    assert cache.get('+init=epsg:4326', '+init=epsg:26918') is not first
+    assert cache.get(' +init=epsg:4326 ', '+init=epsg:26918') is not first
+    assert cache.cache_info() == (2, 2, 2, 2)
+    # the least recently used pair is evicted
+    cache.get(UTM18N, WGS84)
+    assert cache.get(WGS84, UTM18N) is not first
+    assert cache.cache_info().misses == 4
+
+    cache.maxsize = 0
+    assert cache.cache_info().currsize == 0
+    assert cache.get(WGS84, UTM18N) is not cache.get(WGS84, UTM18N)
+    with pytest.raises(ValueError):
+        cache.maxsize = -1
+    cache.clear()
+    assert cache.cache_info() == (0, 0, 0, 0)
+
+
+def test_to_crs_uses_cache():
+    s = GeoSeries([Point(-74, 40.7)], crs=WGS84)
+    transformer_cache.clear()
+    s.to_crs(UTM18N)
+    s.to_crs(epsg=26918)
+    info = transformer_cache.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+
+
+def test_to_crs_n_jobs():
+    geoms = [Point(-74 + i * 0.01, 40.7) for i in range(20)]
+    s = GeoSeries(geoms, crs=WGS84)
+    expected = s.to_crs(UTM18N)
+    res = s.to_crs(UTM18N, n_jobs=3)
+    assert res.crs == UTM18N
+    assert all(a.equals(b) for a, b in zip(res, expected))
+    res = s.to_crs(UTM18N, n_jobs=-1)
+    assert all(a.equals(b) for a, b in zip(res, expected))
+
+    executor = RecordingExecutor()
+    res = s.to_crs(UTM18N, n_jobs=4, executor=executor)
+    assert len(executor.tasks) == 4
+    assert all(a.equals(b) for a, b in zip(res, expected))
+
+    with pytest.raises(ValueError):
+        s.to_crs(UTM18N, n_jobs=0)
+
+
+def test_to_crs_process_pool():
+    futures = pytest.importorskip('concurrent.futures')
+    df = GeoDataFrame({'a': range(10)},
+                      geometry=[Point(-74 + i * 0.01, 40.7)
+                                for i in range(10)],
+                      crs=WGS84)
+    expected = df.to_crs(UTM18N)
+    with futures.ProcessPoolExecutor(2) as executor:
+        res = df.to_crs(UTM18N, n_jobs=2, executor=executor)
+    assert res.crs == UTM18N
+    assert all(a.equals(b) for a, b in zip(res.geometry, expected.geometry))
@@ -252,6 +252,82 @@ class TestGeomMethods:
         result = gdf.bounds
         assert_frame_equal(expected, result)
 
+    def test_bounds_missing_empty(self):
+        s = GeoSeries([self.t1, None, Polygon(), Point()])
+        result = s.bounds
+        assert_array_equal(result.iloc[0], [0, 0, 1, 1])
+        assert result.iloc[1:].isnull().all().all()
+        assert_array_equal(s.total_bounds, [0, 0, 1, 1])
+        assert np.isnan(GeoSeries([None]).total_bounds).all()
+
+    def test_bounds_cached(self):
+        s = GeoSeries([self.t1, self.sq])
+        s.bounds
+        assert s._bounds_cache is not None
+        # modifying the returned frame does not affect the cache
+        result = s.bounds
+        result.iloc[0] = 10
+        assert_array_equal(s.total_bounds, [0, 0, 1, 1])
+
+        # in place modification drops the cached bounds
+        s[1] = self.t3
+        assert s._bounds_cache is None
+        assert_array_equal(s.total_bounds, [0, 0, 3, 1])
+        s = GeoSeries([self.t1, None])
+        assert_array_equal(s.total_bounds, [0, 0, 1, 1])
+        s.fillna(self.t3, inplace=True)
+        assert_array_equal(s.total_bounds, [0, 0, 3, 1])
+
+        gdf = GeoDataFrame({'geometry': [self.t1, self.sq], 'a': [1, 2]})
+        assert_array_equal(gdf.total_bounds, [0, 0, 1, 1])
+        gdf['a'] = [3, 4]
+        assert gdf._bounds_cache is not None
+        gdf['geometry'] = [self.t1, self.t3]
+        assert_array_equal(gdf.total_bounds, [0, 0, 3, 1])
+
+    def test_bounds_cached_at_iat(self):
+        # .at and .iat do not go through __setitem__
+        target = Polygon([(99, 99), (101, 99), (101, 101), (99, 101)])
+        s = GeoSeries([self.t1, self.sq])
+        s.bounds
+        s.sindex
+        s.at[0] = Point(100, 100)
+        assert_array_equal(s.total_bounds, [0, 0, 100, 100])
+        assert_array_equal(s.intersects(target), [True, False])
+        assert list(s.sindex.intersection((99, 99, 101, 101))) == [0]
+        s.iat[1] = self.t3
+        assert_array_equal(s.bounds.iloc[1], [2, 0, 3, 1])
+
+        gdf = GeoDataFrame({'a': [1, 2], 'geometry': [self.t1, self.sq]})
+        gdf.bounds
+        gdf.geometry.sindex
+        gdf.sindex
+        gdf.at[0, 'geometry'] = Point(100, 100)
+        assert_array_equal(gdf.total_bounds, [0, 0, 100, 100])
+        assert_array_equal(gdf.intersects(target), [True, False])
+        assert_array_equal(gdf.geometry.intersects(target), [True, False])
+        assert list(gdf.cx[99:101, 99:101].index) == [0]
+        assert list(gdf.sindex.intersection((99, 99, 101, 101))) == [0]
+        gdf.iat[1, 1] = self.t3
+        assert_array_equal(gdf.bounds.iloc[1], [2, 0, 3, 1])
+        # a column of the frame set with .at
+        gdf.geometry.at[1] = Point(-1, -1)
+        assert_array_equal(gdf.total_bounds, [-1, -1, 100, 100])
+        # other columns keep the cache
+        gdf.at[0, 'a'] = 10
+        assert gdf._bounds_cache is not None
+
+    def test_predicate_bounds_prefilter(self):
+        # predicates against a scalar reuse the cached bounds
+        s = GeoSeries([self.t1, self.t3, self.sq, None, self.p0])
+        expected = s.intersects(self.sq)
+        s.bounds
+        assert_series_equal(s.intersects(self.sq), expected)
+        assert_array_equal(s.contains(Point(0.9, 0.1)),
+                           [True, False, True, False, False])
+        assert_array_equal(s.within(self.sq),
+                           [True, False, True, False, False])
+
     def test_unary_union(self):
         p1 = self.t1
         p2 = Polygon([(2, 0), (3, 0), (3, 1)])
@@ -284,6 +360,15 @@ class TestGeomMethods:
         expected = [False, False, False, False, False, True]
         assert_array_equal(expected, self.g0.disjoint(self.t1))
 
+    def test_disjoint_empty(self):
+        # every non-empty geometry is disjoint from an empty geometry, empty
+        # and missing geometries are not disjoint from anything
+        s = GeoSeries([self.t1, Polygon(), None])
+        assert_array_equal(s.disjoint(Polygon()), [True, False, False])
+        assert_array_equal(s.disjoint(self.t3), [True, False, False])
+        other = GeoSeries([Polygon(), self.t3, self.t3])
+        assert_array_equal(s.disjoint(other), [False, False, False])
+
     def test_distance(self):
         expected = Series(np.array([np.sqrt((5 - 1)**2 + (5 - 1)**2), np.nan]),
                           self.na_none.index)
@@ -322,6 +407,36 @@ class TestGeomMethods:
         expected = Series(np.array([True] * len(self.g1)), self.g1.index)
         self._test_unary_real('is_valid', expected, self.g1)
 
+    def test_is_valid_cached(self):
+        bowtie = Polygon([(0, 0), (1, 1), (1, 0), (0, 1)])
+        s = GeoSeries([self.t1, bowtie, None])
+        assert_array_equal(s.is_valid, [True, False, False])
+        assert s._valid_cache is not None
+        # modifying the returned series does not affect the cache
+        result = s.is_valid
+        result.iloc[0] = False
+        assert_array_equal(s.is_valid, [True, False, False])
+        # reused by copies and subsets
+        assert s.copy()._valid_cache is not None
+        assert_array_equal(s.take([2, 1, 0])._valid_cache, [False, False, True])
+
+        # in place modification drops the cached validity
+        s[1] = self.sq
+        assert s._valid_cache is None
+        assert_array_equal(s.is_valid, [True, True, False])
+        s.at[0] = bowtie
+        assert_array_equal(s.is_valid, [False, True, False])
+        s.iat[0] = self.t1
+        assert_array_equal(s.is_valid, [True, True, False])
+
+        gdf = GeoDataFrame({'a': [1, 2], 'geometry': [self.t1, self.sq]})
+        assert_array_equal(gdf.is_valid, [True, True])
+        gdf.at[0, 'geometry'] = bowtie
+        assert_array_equal(gdf.is_valid, [False, True])
+        assert_array_equal(gdf.geometry.is_valid, [False, True])
+        gdf.iat[0, 1] = self.t1
+        assert_array_equal(gdf.is_valid, [True, True])
+
     def test_is_empty(self):
         expected = Series(np.array([False] * len(self.g1)), self.g1.index)
         self._test_unary_real('is_empty', expected, self.g1)
@@ -372,6 +487,13 @@ class TestGeomMethods:
         for expected, computed in zip(exp_interiors, square_series.interiors):
             assert computed[0].equals(expected)
 
+    def test_interiors_missing(self):
+        s = GeoSeries([self.nested_squares, None])
+        res = s.interiors
+        assert res.dtype == object
+        assert len(res[0]) == 1
+        assert res[1] is False
+
     def test_interpolate(self):
         expected = GeoSeries([Point(0.5, 1.0), Point(0.75, 1.0)])
         self._test_binary_topological('interpolate', expected, self.g5,
@@ -381,6 +503,11 @@ class TestGeomMethods:
         self._test_binary_topological('interpolate', expected, self.g5,
                                       1.5)
 
+    def test_interpolate_distance_per_row(self):
+        expected = GeoSeries([Point(0.0, 0.5), Point(1.0, 0.5)])
+        result = self.g5.interpolate(Series([0.5, 1.5], index=self.g5.index))
+        assert geom_equals(expected, result)
+
     def test_project(self):
         expected = Series([2.0, 1.5], index=self.g5.index)
         p = Point(1.0, 0.5)
@@ -390,6 +517,14 @@ class TestGeomMethods:
         self._test_binary_real('project', expected, self.g5, p,
                                normalized=True)
 
+    def test_project_empty(self):
+        # NaN like distance for empty and missing geometries
+        s = GeoSeries([self.l1, LineString(), None])
+        result = s.project(Point(1.0, 0.5))
+        assert_array_equal(result, [2.0, np.nan, np.nan])
+        assert result.dtype == np.float64
+        assert np.isnan(s.project(Point())).all()
+
     def test_translate_tuple(self):
         trans = self.sol.x - self.esb.x, self.sol.y - self.esb.y
         assert self.landmarks.translate(*trans)[0].equals(self.sol)
@@ -444,6 +579,43 @@ class TestGeomMethods:
         res = res.skew(ys=-skew, origin=o)
         assert geom_almost_equals(expected, res)
 
+    def test_affine_matches_shapely(self):
+        import shapely.affinity as affinity
+        geoms = [self.t1, self.l1, self.p0, Point(), None,
+                 Polygon([(0, 0), (10, 0), (10, 10), (0, 10)],
+                         [[(1, 1), (2, 1), (2, 2)]]),
+                 MultiPoint([(0, 0), (3, 4)])]
+        s = GeoSeries(geoms)
+        for origin in ['center', 'centroid', (1, 2), Point(3, 4)]:
+            for method, args in [('rotate', (33,)), ('rotate', (90,)),
+                                 ('scale', (2, 3)), ('skew', (10, 20))]:
+                res = getattr(s, method)(*args, origin=origin)
+                for geom, r in zip(geoms, res):
+                    if geom is None or geom.is_empty:
+                        assert r is geom
+                        continue
+                    expected = getattr(affinity, method)(geom, *args,
+                                                         origin=origin)
+                    assert r.almost_equals(expected, decimal=10)
+
+    def test_affine_transform(self):
+        s = GeoSeries([self.p0, LineString([(0, 0, 1), (1, 1, 2)])])
+        res = s.affine_transform([2, 0, 0, 3, 1, 1])
+        assert res[0].equals(Point(11, 16))
+        assert res[1].equals(LineString([(1, 1, 1), (3, 4, 2)]))
+        assert res[1].has_z
+        # z is transformed with a 3D matrix
+        res = s.affine_transform([1, 0, 0.5, 0, 1, 0, 0, 0, 2, 0, 0, 1])
+        assert res[1].coords[:] == [(0.5, 0, 3), (2, 1, 5)]
+        # one matrix per row
+        res = s.affine_transform([[1, 0, 0, 1, 5, 0], [1, 0, 0, 1, 0, 5]])
+        assert res[0].equals(Point(10, 5))
+        assert res[1].coords[:] == [(0, 5, 1), (1, 6, 2)]
+        with pytest.raises(ValueError):
+            s.affine_transform([1, 2, 3])
+        with pytest.raises(ValueError):
+            s.affine_transform([[1, 0, 0, 1, 5, 0]])
+
     def test_buffer(self):
         original = GeoSeries([Point(0, 0)])
         expected = GeoSeries([Polygon(((5, 0), (0, -5), (-5, 0), (0, 5),
@@ -451,6 +623,22 @@ class TestGeomMethods:
         calculated = original.buffer(5, resolution=1)
         assert geom_almost_equals(expected, calculated)
 
+    def test_buffer_distance_per_row(self):
+        original = GeoSeries([Point(0, 0), Point(10, 10), None],
+                             crs={'init': 'epsg:4326'})
+        for distance in [[1, 2, 3], np.array([1, 2, 3]),
+                         Series([1, 2, 3], index=original.index)]:
+            calculated = original.buffer(distance, resolution=1)
+            assert calculated.crs == original.crs
+            assert calculated[0].equals(Point(0, 0).buffer(1, 1))
+            assert calculated[1].equals(Point(10, 10).buffer(2, 1))
+            assert calculated[2] is None
+
+        with pytest.raises(ValueError):
+            original.buffer([1, 2])
+        with pytest.raises(ValueError):
+            original.buffer(Series([1, 2, 3], index=[1, 2, 3]))
+
     def test_buffer_args(self):
         args = dict(cap_style=3, join_style=2, mitre_limit=2.5)
         calculated_series = self.g0.buffer(10, **args)
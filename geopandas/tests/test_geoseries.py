@@ -151,6 +151,37 @@ class TestSeries:
         with pytest.raises(TypeError):
             self.landmarks.to_crs(crs=None, epsg=None)
 
+    def test_transform_mixed(self):
+        # all geometry types are transformed in one go, missing and empty
+        # geometries are kept
+        poly = Polygon([(-74, 40), (-73, 40), (-73, 41)],
+                       [[(-73.9, 40.1), (-73.5, 40.1), (-73.5, 40.4)]])
+        geoms = [self.esb, LineString([(-74, 40, 10), (-73, 41, 20)]), poly,
+                 MultiPolygon([poly, poly.buffer(-0.01)]), None, Polygon()]
+        s = GeoSeries(geoms, crs=self.landmarks.crs, name='geoms')
+        utm18n = s.to_crs(epsg=26918)
+        assert utm18n.name == 'geoms'
+        assert utm18n[4] is None
+        assert utm18n[5].is_empty
+        assert utm18n[1].has_z
+        assert utm18n[1].coords[0][2] == 10
+        assert utm18n[2].interiors[0].coords[0] != poly.interiors[0].coords[0]
+        lonlat = utm18n.to_crs(epsg=4326)
+        for geom, res in zip(geoms[:4], lonlat[:4]):
+            assert res.geom_type == geom.geom_type
+            assert res.almost_equals(geom)
+
+    def test_transform_zero_z(self):
+        # the z of 3D geometries is transformed even if it is 0
+        s = GeoSeries([Point(500000, 4500000, 0), Point(500000, 4500000)],
+                      crs={'init': 'epsg:32618'})
+        res = s.to_crs(epsg=4978)
+        assert res[0].has_z
+        assert res[0].z == pytest.approx(4133083.85, abs=1)
+        assert not res[1].has_z
+        assert res[1].x == pytest.approx(res[0].x)
+        assert res[1].y == pytest.approx(res[0].y)
+
     def test_fillna(self):
         # default is to fill with empty geometry
         na = self.na_none.fillna()
@@ -1,13 +1,24 @@
 from __future__ import absolute_import
 
-from shapely.geometry import Point
+from pandas.util.testing import assert_frame_equal
+from shapely.geometry import Point, Polygon, box
+from shapely.ops import unary_union
 
 import geopandas
 from geopandas import GeoDataFrame, read_file, overlay
+from geopandas.tests.util import RecordingExecutor
 
 import pytest
 
 
+def assert_overlay_equal(left, right):
+    # the geometries are compared exactly, including their vertex order
+    assert_frame_equal(left.drop('geometry', axis=1),
+                       right.drop('geometry', axis=1))
+    assert ([geom.wkb for geom in left.geometry] ==
+            [geom.wkb for geom in right.geometry])
+
+
 class TestDataFrame:
 
     def setup_method(self):
@@ -34,7 +45,7 @@ class TestDataFrame:
         # why is the sindex not generated automatically?
         self.polydf2._generate_sindex()
 
-        self.union_shape = (180, 7)
+        self.union_shape = (30, 7)
 
     def test_union(self):
         df = overlay(self.polydf, self.polydf2, how="union")
@@ -69,19 +80,122 @@ class TestDataFrame:
     def test_intersection(self):
         df = overlay(self.polydf, self.polydf2, how="intersection")
         assert df['BoroName'][0] is not None
-        assert df.shape == (68, 7)
+        assert df.shape == (15, 7)
 
     def test_identity(self):
         df = overlay(self.polydf, self.polydf2, how="identity")
-        assert df.shape == (154, 7)
+        assert df.shape == (20, 7)
 
     def test_symmetric_difference(self):
         df = overlay(self.polydf, self.polydf2, how="symmetric_difference")
-        assert df.shape == (122, 7)
+        assert df.shape == (15, 7)
 
     def test_difference(self):
         df = overlay(self.polydf, self.polydf2, how="difference")
-        assert df.shape == (86, 7)
+        assert df.shape == (5, 7)
+
+    def test_intersection_pairs(self):
+        df = overlay(self.polydf, self.polydf2, how="intersection")
+        expected = [(i, j) for i, a in enumerate(self.polydf.geometry)
+                    for j, b in enumerate(self.polydf2.geometry)
+                    if not a.intersection(b).is_empty]
+        assert len(df) == len(expected)
+        assert df.area.sum() == pytest.approx(
+            sum(self.polydf.geometry[i].intersection(
+                self.polydf2.geometry[j]).area for i, j in expected))
+        # the attributes of both rows of each pair, with their dtype
+        idx1, idx2 = zip(*expected)
+        assert (df['BoroName'].tolist() ==
+                self.polydf['BoroName'].take(idx1).tolist())
+        assert df['value1'].tolist() == self.polydf2['value1'].take(idx2).tolist()
+        assert df['value1'].dtype == self.polydf2['value1'].dtype
+
+    def test_difference_areas(self):
+        df = overlay(self.polydf, self.polydf2, how="difference")
+        other = unary_union(self.polydf2.geometry.values)
+        expected = [geom.difference(other) for geom in self.polydf.geometry]
+        assert df.area.tolist() == pytest.approx(
+            [geom.area for geom in expected])
+        assert df['BoroName'].tolist() == self.polydf['BoroName'].tolist()
+        assert df['value1'].isnull().all()
+
+    def test_union_no_pairs(self):
+        far = self.polydf2.copy()
+        far['geometry'] = far.translate(xoff=1e7)
+        df = overlay(self.polydf, far, how="union")
+        assert df.shape == (len(self.polydf) + len(far), 7)
+        assert df['BoroName'][:len(self.polydf)].notnull().all()
+        assert df['value1'][len(self.polydf):].notnull().all()
+
+    @pytest.mark.parametrize('how', ['intersection', 'union', 'identity',
+                                     'symmetric_difference', 'difference'])
+    def test_tile_size(self, how):
+        # several tiles on both sides
+        expected = overlay(self.polydf, self.polydf2, how=how)
+        df = overlay(self.polydf, self.polydf2, how=how, tile_size=2)
+        assert_overlay_equal(df, expected)
+        df = overlay(self.polydf, self.polydf2, how=how, tile_size=2,
+                     use_sindex=False)
+        assert_overlay_equal(df, expected)
+
+    @pytest.mark.parametrize('how', ['intersection', 'union',
+                                     'symmetric_difference'])
+    def test_n_jobs(self, how):
+        expected = overlay(self.polydf, self.polydf2, how=how)
+        for n_jobs in [2, -1]:
+            df = overlay(self.polydf, self.polydf2, how=how, n_jobs=n_jobs)
+            assert_overlay_equal(df, expected)
+        df = overlay(self.polydf, self.polydf2, how=how, n_jobs=2,
+                     tile_size=3)
+        assert_overlay_equal(df, expected)
+
+        with pytest.raises(ValueError):
+            overlay(self.polydf, self.polydf2, how=how, n_jobs=0)
+
+    def test_n_jobs_windows(self):
+        expected = overlay(self.polydf, self.polydf2, how='union')
+        executor = RecordingExecutor()
+        df = overlay(self.polydf, self.polydf2, how='union', tile_size=1,
+                     n_jobs=2, executor=executor)
+        assert_overlay_equal(df, expected)
+        # the tiles are submitted a few at a time
+        assert len(executor.sizes) > 1
+        assert max(executor.sizes) == 4
+
+    def test_process_pool(self):
+        futures = pytest.importorskip('concurrent.futures')
+        expected = overlay(self.polydf, self.polydf2, how='union')
+        with futures.ProcessPoolExecutor(2) as executor:
+            df = overlay(self.polydf, self.polydf2, how='union', n_jobs=2,
+                         executor=executor)
+        assert_overlay_equal(df, expected)
+
+    def test_make_valid(self):
+        expected = overlay(self.polydf, self.polydf2, how='union')
+        df = overlay(self.polydf, self.polydf2, how='union', make_valid=False)
+        assert_overlay_equal(df, expected)
+        # the validity is checked once per frame
+        assert self.polydf._valid_cache is not None
+        assert self.polydf2._valid_cache is not None
+
+        bowtie = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+        df1 = GeoDataFrame({'a': [1], 'geometry': [bowtie]})
+        df2 = GeoDataFrame({'b': [2], 'geometry': [box(0, 0, 2, 2)]})
+        df = overlay(df1, df2, how='intersection')
+        assert df.is_valid.all()
+        assert df.area.tolist() == pytest.approx([bowtie.buffer(0).area])
+
+        # a polygon made invalid after its validity was cached
+        df1 = GeoDataFrame({'a': [1], 'geometry': [box(0, 0, 2, 2)]})
+        assert df1.is_valid.all()
+        df1.at[0, 'geometry'] = bowtie
+        df = overlay(df1, df2, how='intersection')
+        assert df.is_valid.all()
+        assert df.area.tolist() == pytest.approx([bowtie.buffer(0).area])
+
+    def test_invalid_tile_size(self):
+        with pytest.raises(ValueError):
+            overlay(self.polydf, self.polydf2, how="union", tile_size=0)
 
     def test_bad_how(self):
         with pytest.raises(ValueError):
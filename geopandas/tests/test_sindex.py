@@ -1,15 +1,15 @@
-import sys
-
-from shapely.geometry import Polygon, Point
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString, Polygon, Point
+from shapely.geometry.base import BaseGeometry
 
 import geopandas
-from geopandas import GeoSeries, GeoDataFrame, base, read_file
+from geopandas import GeoSeries, GeoDataFrame, read_file
+from geopandas.sindex import SpatialIndex, INVERSE_PREDICATES
 
 import pytest
 
 
-@pytest.mark.skipif(sys.platform.startswith("win"), reason="fails on AppVeyor")
-@pytest.mark.skipif(not base.HAS_SINDEX, reason='Rtree absent, skipping')
 class TestSeriesSindex:
 
     def test_empty_index(self):
@@ -48,6 +48,17 @@ class TestSeriesSindex:
         assert len(s) == 6
         assert s.sindex.size == 6
 
+    def test_sindex_kept_on_selection(self):
+        s = GeoSeries([Point(x, x) for x in range(10)])
+        sindex = s.sindex
+        res = s[s.x > 0]
+        assert res._sindex_generated is True
+        assert res.sindex.size == 9
+        assert res.sindex.intersection((0, 0, 1, 1)) == [0]
+        res = s.sort_index(ascending=False)
+        assert res.sindex.intersection((0, 0, 1, 1)) == [8, 9]
+        assert s.copy()._sindex._nodes is sindex._nodes
+
     def test_lazy_build(self):
         s = GeoSeries([Point(0, 0)])
         assert s._sindex is None
@@ -55,8 +66,6 @@ class TestSeriesSindex:
         assert s._sindex is not None
 
 
-@pytest.mark.skipif(sys.platform.startswith("win"), reason="fails on AppVeyor")
-@pytest.mark.skipif(not base.HAS_SINDEX, reason='Rtree absent, skipping')
 class TestFrameSindex:
     def setup_method(self):
         data = {"A": range(5), "B": range(-5, 0),
@@ -84,6 +93,370 @@ class TestFrameSindex:
             inplace=True)
         assert self.df._sindex_generated is False
 
+    def test_sindex_kept_on_column_selection(self):
+        sindex = self.df.sindex
+        res = self.df[['A', 'location']]
+        assert res._sindex_generated is True
+        assert res._sindex._nodes is sindex._nodes
+        assert res.sindex.intersection((2.5, 2.5, 4, 4)) == [3, 4]
+        assert res.geometry._sindex._nodes is sindex._nodes
+
+    def test_sindex_kept_on_copy(self):
+        sindex = self.df.sindex
+        for deep in [True, False]:
+            res = self.df.copy(deep=deep)
+            assert res._sindex._nodes is sindex._nodes
+        res = self.df.copy()
+        res.set_geometry([Point(0, 0)] * 5, inplace=True)
+        assert res._sindex_generated is False
+        assert self.df._sindex is sindex
+
+    def test_sindex_objects_follow_index(self):
+        sindex = self.df.sindex
+        res = self.df.copy()
+        res.index = list('abcde')
+        hits = res.sindex.intersection((2.5, 2.5, 4, 4), objects='raw')
+        assert hits == ['d', 'e']
+        assert res.sindex._nodes is sindex._nodes
+        assert self.df.sindex.intersection((2.5, 2.5, 4, 4),
+                                           objects='raw') == [3, 4]
+
+    def test_sindex_kept_on_set_geometry_same_column(self):
+        sindex = self.df.sindex
+        res = self.df.set_geometry('location')
+        assert res._sindex._nodes is sindex._nodes
+        res = self.df.set_geometry(self.df.geometry)
+        assert res._sindex._nodes is sindex._nodes
+
+    def test_sindex_remapped_on_row_subset(self):
+        self.df.index = list('abcde')
+        assert self.df.sindex.size == 5
+        res = self.df[self.df['A'] > 0]
+        assert res._sindex_generated is True
+        assert res.sindex.size == 4
+        hits = res.sindex.intersection((0, 0, 2.5, 2.5), objects=True)
+        assert [(hit.id, hit.object) for hit in hits] == [(0, 'b'),
+                                                          (1, 'c')]
+        res = res.iloc[::-1]
+        hits = res.sindex.intersection((0, 0, 2.5, 2.5), objects=True)
+        assert [(hit.id, hit.object) for hit in hits] == [(2, 'c'),
+                                                          (3, 'b')]
+
+    def test_sindex_rows_not_matching(self):
+        self.df.index = [0, 0, 1, 2, 3]
+        self.df.sindex
+        res = self.df.iloc[[1, 0, 2, 3, 4]]
+        assert res._sindex_generated is False
+        assert res.sindex.intersection((0, 0, 0, 0)) == [1]
+
+
+def _brute_force_intersection(bounds, query):
+    with np.errstate(invalid='ignore'):
+        match = ((bounds[None, :, 0] <= query[:, None, 2]) &
+                 (bounds[None, :, 1] <= query[:, None, 3]) &
+                 (bounds[None, :, 2] >= query[:, None, 0]) &
+                 (bounds[None, :, 3] >= query[:, None, 1]))
+    return np.nonzero(match)
+
+
+class TestSpatialIndex:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        xy = rng.rand(1000, 2) * 100
+        self.bounds = np.hstack([xy, xy + rng.rand(1000, 2) * 5])
+        self.bounds[[3, 500]] = np.nan
+        xy = rng.rand(100, 2) * 100
+        self.query = np.hstack([xy, xy + rng.rand(100, 2) * 10])
+        self.query[7] = np.nan
+
+    @pytest.mark.parametrize('node_capacity', [2, 4, 16])
+    def test_intersection_bulk(self, node_capacity):
+        tree = SpatialIndex(self.bounds, node_capacity=node_capacity)
+        assert tree.size == 998
+        input_idx, tree_idx = tree.intersection_bulk(self.query)
+        expected = _brute_force_intersection(self.bounds, self.query)
+        np.testing.assert_array_equal(input_idx, expected[0])
+        np.testing.assert_array_equal(tree_idx, expected[1])
+
+    def test_intersection(self):
+        tree = SpatialIndex(self.bounds)
+        expected = _brute_force_intersection(self.bounds, self.query[:1])[1]
+        assert tree.intersection(self.query[0]) == expected.tolist()
+
+    def test_intersection_objects(self):
+        tree = SpatialIndex([[0, 0, 1, 1], [np.nan] * 4, [2, 2, 3, 3]],
+                            objects=['a', 'b', 'c'])
+        hits = tree.intersection((0.5, 0.5, 2, 2), objects=True)
+        assert [hit.id for hit in hits] == [0, 2]
+        assert [hit.object for hit in hits] == ['a', 'c']
+        assert hits[1].bbox == [2, 2, 3, 3]
+        assert tree.intersection((2.5, 2.5), objects='raw') == ['c']
+
+    def test_count(self):
+        tree = SpatialIndex(self.bounds)
+        expected = _brute_force_intersection(self.bounds, self.query[:1])[1]
+        assert tree.count(self.query[0]) == len(expected)
+        assert tree.count((50, 50)) == len(tree.intersection((50, 50)))
+
+    @pytest.mark.parametrize('k', [1, 5])
+    def test_nearest_coordinates(self, k):
+        # rtree style query with a box or a point
+        tree = SpatialIndex(self.bounds, objects=np.arange(1000) * 10)
+        for coordinates in [tuple(self.query[0]), (50.0, 50.0)]:
+            query = coordinates * (2 if len(coordinates) == 2 else 1)
+            dx = np.maximum(np.maximum(query[0] - self.bounds[:, 2],
+                                       self.bounds[:, 0] - query[2]), 0)
+            dy = np.maximum(np.maximum(query[1] - self.bounds[:, 3],
+                                       self.bounds[:, 1] - query[3]), 0)
+            distances = np.hypot(dx, dy)
+            limit = np.sort(distances[~np.isnan(distances)])[k - 1]
+            expected = [j for _, j in sorted(
+                (d, j) for j, d in enumerate(distances) if d <= limit)]
+            assert tree.nearest(coordinates, k) == expected
+            assert tree.nearest(coordinates, k, objects='raw') == [
+                j * 10 for j in expected]
+
+        # neighbours at the same distance are all returned
+        tree = SpatialIndex([[0, 0, 1, 1], [2, 0, 3, 1], [5, 5, 6, 6]])
+        assert tree.nearest((1.5, 0.5, 1.5, 0.5), 1) == [0, 1]
+
+    def test_empty(self):
+        tree = SpatialIndex(np.empty((0, 4)))
+        assert tree.is_empty
+        input_idx, tree_idx = tree.intersection_bulk([[0, 0, 1, 1]])
+        assert len(input_idx) == len(tree_idx) == 0
+        assert tree.intersection((0, 0, 1, 1)) == []
+        assert tree.count((0, 0, 1, 1)) == 0
+        assert tree.nearest((0, 0), 3) == []
+
+    def test_geoseries_bulk(self):
+        s = GeoSeries([Point(0, 0), None, Point(1, 1), Point(5, 5)],
+                      index=list('abcd'))
+        input_idx, tree_idx = s.sindex.intersection_bulk(
+            [[-1, -1, 1, 1], [4, 4, 6, 6]])
+        assert input_idx.tolist() == [0, 0, 1]
+        assert tree_idx.tolist() == [0, 2, 3]
+
+
+class TestAppend:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        xy = rng.rand(1000, 2) * 100
+        self.bounds = np.hstack([xy, xy + rng.rand(1000, 2) * 5])
+        self.bounds[[3, 500]] = np.nan
+        xy = rng.rand(100, 2) * 100
+        self.query = np.hstack([xy, xy + rng.rand(100, 2) * 10])
+
+    def assert_same_results(self, tree, bounds):
+        expected = _brute_force_intersection(bounds, self.query)
+        input_idx, tree_idx = tree.intersection_bulk(self.query)
+        np.testing.assert_array_equal(input_idx, expected[0])
+        np.testing.assert_array_equal(tree_idx, expected[1])
+
+    def test_append(self):
+        tree = SpatialIndex(self.bounds[:800])
+        for start in range(800, 980, 10):
+            tree = tree.append(self.bounds[start:start + 10])
+            self.assert_same_results(tree, self.bounds[:start + 10])
+            assert tree.size == np.isfinite(
+                self.bounds[:start + 10, 0]).sum()
+        # the main tree was not rebuilt for every append
+        assert tree._delta is not None
+        assert tree._delta.size < tree._size
+        assert tree.intersection(self.query[0]) == \
+            tree.intersection_bulk(self.query[:1])[1].tolist()
+        np.testing.assert_array_equal(
+            tree.bounds, SpatialIndex(self.bounds[:980]).bounds)
+
+    def test_compact(self):
+        tree = SpatialIndex(self.bounds[:900]).append(self.bounds[900:])
+        nodes = tree._nodes
+        tree.compact()
+        assert tree._delta is None
+        assert tree._nodes is not nodes
+        self.assert_same_results(tree, self.bounds)
+
+    def test_merged_when_large(self):
+        tree = SpatialIndex(self.bounds[:500]).append(self.bounds[500:])
+        assert tree._delta is None
+        self.assert_same_results(tree, self.bounds)
+
+    def test_nearest(self):
+        s = GeoSeries([Point(x, y) for x, y in self.query[:, :2]])
+        bounds = s._geometry_bounds
+        tree = SpatialIndex(bounds[:90]).append(
+            bounds[90:], geometries=s._geometry_array)
+        assert tree._delta is not None
+        expected = s.sindex.nearest(s[:20], k=3)
+        res = tree.nearest(s[:20], k=3)
+        for left, right in zip(res, expected):
+            np.testing.assert_array_equal(left, right)
+
+    def test_series_append(self):
+        s = GeoSeries([Point(x, x) for x in range(10)])
+        sindex = s.sindex
+        res = s.append(GeoSeries([Point(20, 20)], index=[10]))
+        assert res._sindex_generated is True
+        assert res._sindex._nodes is sindex._nodes
+        assert res.sindex.intersection((19, 19, 21, 21)) == [10]
+
+    def test_frame_concat(self):
+        df = GeoDataFrame({'A': range(10),
+                           'geometry': [Point(x, x) for x in range(10)]})
+        sindex = df.sindex
+        other = GeoDataFrame({'A': [10], 'geometry': [Point(20, 20)]})
+        res = pd.concat([df, other], ignore_index=True)
+        assert res._sindex._nodes is sindex._nodes
+        hits = res.sindex.intersection((8, 8, 21, 21), objects=True)
+        assert [(hit.id, hit.object) for hit in hits] == [(8, 8), (9, 9),
+                                                          (10, 10)]
+
+
+class TestSaveLoad:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        self.s = GeoSeries([Point(x, y) for x, y in rng.rand(500, 2) * 10] +
+                           [None])
+        rng = np.random.RandomState(1)
+        xy = rng.rand(50, 2) * 10
+        self.query = np.hstack([xy, xy + 1])
+
+    @pytest.mark.parametrize('mmap', [True, False])
+    def test_save_load(self, tmpdir, mmap):
+        path = str(tmpdir.join('points.sindex'))
+        self.s.sindex.save(path)
+        loaded = SpatialIndex.load(path, geometries=self.s._geometry_array,
+                                   mmap=mmap)
+        assert isinstance(loaded._nodes, np.memmap) == mmap
+        assert loaded.size == 500
+        expected = self.s.sindex.intersection_bulk(self.query)
+        res = loaded.intersection_bulk(self.query)
+        np.testing.assert_array_equal(res[0], expected[0])
+        np.testing.assert_array_equal(res[1], expected[1])
+        res = loaded.query_bulk(self.s[:10], predicate='intersects')
+        assert res[0].tolist() == res[1].tolist() == list(range(10))
+
+    def test_save_load_empty(self, tmpdir):
+        path = str(tmpdir.join('empty.sindex'))
+        SpatialIndex(np.empty((0, 4))).save(path)
+        assert SpatialIndex.load(path).is_empty
+
+    def test_load_invalid(self, tmpdir):
+        path = str(tmpdir.join('points.sindex'))
+        self.s.sindex.save(path)
+        with pytest.raises(ValueError):
+            SpatialIndex.load(path, geometries=self.s._geometry_array[:5])
+        tmpdir.join('other.sindex').write('not an index')
+        with pytest.raises(ValueError):
+            SpatialIndex.load(str(tmpdir.join('other.sindex')))
+
+
+class TestQueryBulk:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        self.tree_geoms = GeoSeries(
+            [Point(x, y).buffer(r) for x, y, r in rng.rand(200, 3) * 0.5] +
+            [Point(x, y) for x, y in rng.rand(200, 2) * 10] +
+            [None, Polygon()])
+        self.geoms = GeoSeries(
+            [Polygon([(x, y), (x + d, y), (x + d, y + d), (x, y + d)])
+             for x, y, d in rng.rand(50, 3) * [10, 10, 2]] +
+            [Point(5, 5), None])
+
+    def test_batches(self):
+        sindex = self.tree_geoms.sindex
+        expected = [sindex.query_bulk(self.geoms, predicate='intersects'),
+                    sindex.intersection_bulk(self.geoms.bounds.values)]
+        # several batches of query boxes
+        sindex.query_batch_size = 7
+        result = [sindex.query_bulk(self.geoms, predicate='intersects'),
+                  sindex.intersection_bulk(self.geoms.bounds.values)]
+        for res, exp in zip(result, expected):
+            assert res[0].tolist() == exp[0].tolist()
+            assert res[1].tolist() == exp[1].tolist()
+
+    @pytest.mark.parametrize('predicate', ['intersects', 'within',
+                                           'contains', 'overlaps',
+                                           'crosses', 'touches', 'covers',
+                                           'covered_by'])
+    def test_predicates(self, predicate):
+        input_idx, tree_idx = self.tree_geoms.sindex.query_bulk(
+            self.geoms, predicate=predicate)
+        if predicate == 'covered_by':
+            def func(geom, other):
+                return other.covers(geom)
+        else:
+            func = getattr(BaseGeometry, predicate)
+        expected = [
+            (i, j) for i, geom in enumerate(self.geoms)
+            for j, other in enumerate(self.tree_geoms)
+            if geom is not None and other is not None
+            and func(geom, other)]
+        assert list(zip(input_idx, tree_idx)) == expected
+
+        # few indexed geometries with many candidates each
+        input_idx, tree_idx = self.geoms.sindex.query_bulk(
+            self.tree_geoms, predicate=INVERSE_PREDICATES[predicate])
+        assert sorted(zip(tree_idx, input_idx)) == expected
+
+    def test_dwithin(self):
+        input_idx, tree_idx = self.tree_geoms.sindex.query_bulk(
+            self.geoms, predicate='dwithin', distance=0.3)
+        expected = [
+            (i, j) for i, geom in enumerate(self.geoms)
+            for j, other in enumerate(self.tree_geoms)
+            if geom is not None and other is not None
+            and not other.is_empty and geom.distance(other) <= 0.3]
+        assert len(expected) > 0
+        assert list(zip(input_idx, tree_idx)) == expected
+
+        res = self.tree_geoms.sindex.query(Point(5, 5), predicate='dwithin',
+                                           distance=0)
+        expected = self.tree_geoms.sindex.query(Point(5, 5),
+                                                predicate='intersects')
+        np.testing.assert_array_equal(res, expected)
+
+    @pytest.mark.parametrize('predicate, distance', [
+        ('dwithin', None), ('intersects', 1), ('dwithin', -1)])
+    def test_invalid_distance(self, predicate, distance):
+        with pytest.raises(ValueError):
+            self.tree_geoms.sindex.query_bulk(self.geoms, predicate=predicate,
+                                              distance=distance)
+
+    def test_no_predicate(self):
+        sindex = self.tree_geoms.sindex
+        res = sindex.query_bulk(self.geoms)
+        expected = sindex.intersection_bulk(self.geoms.bounds.values)
+        np.testing.assert_array_equal(res[0], expected[0])
+        np.testing.assert_array_equal(res[1], expected[1])
+
+    def test_sequence_input(self):
+        res = self.tree_geoms.sindex.query_bulk(list(self.geoms),
+                                                predicate='intersects')
+        expected = self.tree_geoms.sindex.query_bulk(self.geoms,
+                                                     predicate='intersects')
+        np.testing.assert_array_equal(res[0], expected[0])
+        np.testing.assert_array_equal(res[1], expected[1])
+
+    def test_query(self):
+        s = GeoSeries([Point(0, 0), Point(1, 1), Point(2, 2)])
+        sq = Polygon([(0.5, 0.5), (3, 0.5), (3, 3), (0.5, 3)])
+        assert s.sindex.query(sq, predicate='contains').tolist() == [1, 2]
+        assert s.sindex.query(sq).tolist() == [1, 2]
+
+    def test_invalid_predicate(self):
+        with pytest.raises(ValueError):
+            self.tree_geoms.sindex.query_bulk(self.geoms, predicate='foo')
+
+    def test_no_geometries(self):
+        tree = SpatialIndex(self.tree_geoms.bounds.values)
+        with pytest.raises(ValueError):
+            tree.query_bulk(self.geoms, predicate='intersects')
+
 
 # Skip to accommodate Shapely geometries being unhashable
 @pytest.mark.skip
@@ -122,3 +495,64 @@ class TestJoinSindex:
         hits = tree.intersection((1012821.80, 229228.26), objects=True)
         res = [merged.loc[hit.object]['BoroName'] for hit in hits]
         assert res == ['Bronx', 'Queens']
+
+
+class TestNearest:
+
+    def setup_method(self):
+        rng = np.random.RandomState(0)
+        self.tree_geoms = GeoSeries(
+            [LineString([(x, y), (x + dx, y + dy)])
+             for x, y, dx, dy in rng.rand(300, 4) * [100, 100, 3, 3]] +
+            [None, Polygon()])
+        self.geoms = GeoSeries(
+            [Point(x, y) for x, y in rng.rand(50, 2) * 110] +
+            [None, Polygon([(10, 10), (20, 10), (20, 20)])])
+
+    def _expected(self, k, max_distance=None):
+        expected = []
+        for i, geom in enumerate(self.geoms):
+            if geom is None:
+                continue
+            distances = sorted(
+                (geom.distance(other), j)
+                for j, other in enumerate(self.tree_geoms)
+                if other is not None and not other.is_empty)
+            if max_distance is not None:
+                distances = [(d, j) for d, j in distances
+                             if d <= max_distance]
+            expected.extend((i, j, d) for d, j in distances[:k])
+        return expected
+
+    @pytest.mark.parametrize('k', [1, 3])
+    @pytest.mark.parametrize('max_distance', [None, 2.5])
+    def test_nearest(self, k, max_distance):
+        input_idx, tree_idx, distances = self.tree_geoms.sindex.nearest(
+            self.geoms, k=k, max_distance=max_distance)
+        res = list(zip(input_idx.tolist(), tree_idx.tolist(),
+                       distances.tolist()))
+        assert res == self._expected(k, max_distance)
+
+    def test_nearest_batches(self):
+        sindex = self.tree_geoms.sindex
+        sindex.query_batch_size = 7
+        input_idx, tree_idx, distances = sindex.nearest(self.geoms, k=2)
+        res = list(zip(input_idx.tolist(), tree_idx.tolist(),
+                       distances.tolist()))
+        assert res == self._expected(2)
+        res = sindex.nearest([], k=2)
+        assert [len(arr) for arr in res] == [0, 0, 0]
+
+    def test_nearest_no_distance(self):
+        res = self.tree_geoms.sindex.nearest(self.geoms,
+                                             return_distance=False)
+        assert len(res) == 2
+        expected = self._expected(1)
+        assert res[0].tolist() == [i for i, _, _ in expected]
+        assert res[1].tolist() == [j for _, j, _ in expected]
+
+    def test_nearest_invalid(self):
+        with pytest.raises(ValueError):
+            self.tree_geoms.sindex.nearest(self.geoms, k=0)
+        with pytest.raises(ValueError):
+            self.tree_geoms.sindex.nearest(self.geoms, max_distance=-1)
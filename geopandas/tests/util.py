@@ -20,6 +20,23 @@ except ImportError:
     import mock
 
 
+class RecordingExecutor(object):
+    """
+    Executor running the tasks serially, which records the tasks and the
+    number of tasks submitted by each call to ``map``.
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self.sizes = []
+
+    def map(self, func, tasks):
+        tasks = list(tasks)
+        self.tasks.extend(tasks)
+        self.sizes.append(len(tasks))
+        return map(func, tasks)
+
+
 def validate_boro_df(df, case_sensitive=False):
     """ Tests a GeoDataFrame that has been read in from the nybb dataset."""
     assert isinstance(df, GeoDataFrame)
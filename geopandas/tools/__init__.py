@@ -2,12 +2,13 @@ from __future__ import absolute_import
 
 from .geocoding import geocode, reverse_geocode
 from .overlay import overlay
-from .sjoin import sjoin
+from .sjoin import sjoin, sjoin_nearest
 from .util import collect
 
 __all__ = [
     'overlay',
     'sjoin',
+    'sjoin_nearest',
     'geocode',
     'reverse_geocode',
     'collect',
@@ -1,8 +1,13 @@
+import numpy as np
 import pandas as pd
-from shapely.ops import unary_union, polygonize
-from shapely.geometry import MultiLineString
+from shapely.geometry import MultiPolygon
+from shapely.ops import unary_union
 
 from geopandas import GeoDataFrame, GeoSeries
+from geopandas._parallel import _map, _n_jobs
+from geopandas.array import (
+    GeometryArray, _binary_geo, _unary_geo, _unary_op)
+from geopandas.sindex import SpatialIndex, _str_order
 
 
 def _uniquify(columns):
@@ -17,52 +22,221 @@ def _uniquify(columns):
     return ucols
 
 
-def _extract_rings(df):
-    """Collects all inner and outer linear rings from a GeoDataFrame
-    with (multi)Polygon geometeries
+def _polygonal_geometries(df, make_valid):
+    """GeometryArray with the (multi)polygons of a GeoDataFrame, invalid
+    polygons being fixed with ``buffer(0)`` if ``make_valid``.
 
     Parameters
     ----------
     df: GeoDataFrame with MultiPolygon or Polygon geometry column
+    make_valid: boolean
 
     Returns
     -------
-    rings: list of LinearRings
+    geometries: GeometryArray
     """
     poly_msg = "overlay only takes GeoDataFrames with (multi)polygon geometries"
-    rings = []
-    geometry_column = df.geometry.name
+    geometries = df._geometry_array
+    geom_type = _unary_op('geom_type', geometries, null_value=None)
+    if not np.in1d(geom_type, ['Polygon', 'MultiPolygon']).all():
+        raise TypeError(poly_msg)
+
+    if make_valid:
+        # the validity is cached with the geometries of df
+        invalid = np.flatnonzero(~df._geometry_valid)
+        if len(invalid):
+            # geoms from layer are not valid attempting fix by buffer 0
+            data = geometries.data.copy()
+            data[invalid] = _unary_geo('buffer', geometries.take(invalid),
+                                       0).data
+            geometries = GeometryArray(data)
+    return geometries
+
+
+def _polygonal(geom):
+    """The polygonal part of ``geom`` (e.g. of the GeometryCollection
+    resulting from the intersection of touching polygons), or None if it
+    is empty."""
+    if geom is None or geom.is_empty:
+        return None
+    if geom.type in ('Polygon', 'MultiPolygon'):
+        return geom
+    parts = []
+    for part in getattr(geom, 'geoms', []):
+        if part.type == 'Polygon' and not part.is_empty:
+            parts.append(part)
+        elif part.type == 'MultiPolygon':
+            parts.extend(part.geoms)
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else MultiPolygon(parts)
+
+
+def _polygonal_parts(data):
+    """Positions of the geometries of the object array ``data`` with a
+    polygonal part, and these parts."""
+    out = np.empty(len(data), dtype=object)
+    for i, geom in enumerate(data):
+        out[i] = _polygonal(geom)
+    keep = np.flatnonzero([geom is not None for geom in out])
+    return keep, out[keep]
+
+
+def _tiles(df, tile_size, n_jobs):
+    """
+    Positions of the rows of ``df`` in tiles of at most ``tile_size``
+    neighbouring geometries (runs of their Sort-Tile-Recursive order), each
+    tile being sorted. By default the rows are split in ``n_jobs`` tiles.
+    """
+    n = len(df)
+    if tile_size is None:
+        tile_size = -(-n // n_jobs)
+    if tile_size >= n:
+        return [np.arange(n)]
+    order = _str_order(df._geometry_bounds, tile_size)
+    return [np.sort(order[start:start + tile_size])
+            for start in range(0, n, tile_size)]
 
-    for i, feat in df.iterrows():
-        geom = feat[geometry_column]
 
-        if geom.type not in ['Polygon', 'MultiPolygon']:
-            raise TypeError(poly_msg)
+def _candidate_pairs(df, other, rows, use_sindex):
+    """
+    Positions of the pairs of geometries of ``df`` (at the sorted positions
+    ``rows``) and of ``other`` with intersecting bounding boxes, sorted by
+    the position in ``df`` and then in ``other``.
+    """
+    sindex = other.sindex if use_sindex else None
+    if sindex is None:
+        # temporary tree on the bounds, not kept on ``other``: comparing all
+        # pairs of boxes would take memory in len(df) * len(other)
+        sindex = SpatialIndex(other._geometry_bounds)
+    # the cached bounds of the tile
+    idx, other_idx = sindex.intersection_bulk(df._geometry_bounds[rows])
+    idx = rows[idx]
+    order = np.lexsort((other_idx, idx))
+    return idx[order], other_idx[order]
+
+
+def _overlay_intersection(geoms1, geoms2, idx1, idx2):
+    """Pairs of positions with a polygonal intersection, and these
+    intersections."""
+    intersections = _binary_geo('intersection', geoms1.take(idx1),
+                                geoms2.take(idx2))
+    keep, data = _polygonal_parts(intersections.data)
+    return idx1[keep], idx2[keep], data
+
+
+def _overlay_difference(geoms1, geoms2, idx1, idx2, rows):
+    """
+    Positions of the geometries of ``geoms1`` at the sorted positions
+    ``rows`` that are not entirely covered by ``geoms2``, and their
+    difference with the union of their candidates ``geoms2[idx2]`` (the
+    pairs being sorted by ``idx1``).
+    """
+    data = geoms1.data[rows]
+    if len(idx1):
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(idx1)) + 1])
+        ends = np.append(starts[1:], len(idx1))
+        positions = np.searchsorted(rows, idx1[starts])
+        for pos, start, end in zip(positions, starts, ends):
+            others = geoms2.data[idx2[start:end]]
+            other = others[0] if end - start == 1 else unary_union(others)
+            data[pos] = data[pos].difference(other)
+    keep, data = _polygonal_parts(data)
+    return rows[keep], data
+
+
+def _tile_task(geoms, other_geoms, rows, idx, other_idx, side, intersect,
+               differ):
+    """
+    Arguments of ``_overlay_tile`` for the geometries at the sorted
+    positions ``rows`` of ``geoms`` and their candidate pairs ``idx``,
+    ``other_idx``: only the geometries of the tile and their candidates are
+    passed to the task.
+    """
+    others, other_local = np.unique(other_idx, return_inverse=True)
+    local = np.searchsorted(rows, idx)
+    return (geoms.take(rows), other_geoms.take(others), rows, others, local,
+            other_local, side, intersect, differ)
 
-        if hasattr(geom, 'geoms'):
-            for poly in geom.geoms:  # if it's a multipolygon
-                if not poly.is_valid:
-                    # geom from layer is not valid attempting fix by buffer 0"
-                    poly = poly.buffer(0)
-                rings.append(poly.exterior)
-                rings.extend(poly.interiors)
-        else:
-            if not geom.is_valid:
-                # geom from layer is not valid attempting fix by buffer 0"
-                geom = geom.buffer(0)
-            rings.append(geom.exterior)
-            rings.extend(geom.interiors)
 
-    return rings
+def _overlay_tile(args):
+    """
+    Intersections (if ``intersect``) and differences (if ``differ``) of the
+    geometries of a tile with their candidates, at the positions of the
+    ``side`` (1 or 2) frame of the tile and of the other frame.
+    """
+    (geoms, other_geoms, rows, others, idx, other_idx, side, intersect,
+     differ) = args
+    intersections = differences = None
+    if intersect:
+        tile_idx, candidate_idx, data = _overlay_intersection(
+            geoms, other_geoms, idx, other_idx)
+        intersections = rows[tile_idx], others[candidate_idx], data
+    if differ:
+        positions, data = _overlay_difference(
+            geoms, other_geoms, idx, other_idx, np.arange(len(geoms)))
+        differences = rows[positions], data
+    return side, intersections, differences
+
+
+def _take_attributes(df, idx):
+    """
+    The columns of ``df`` (the geometry column excepted) at the positions
+    ``idx``, taken at once for all columns, with missing values at the -1
+    positions.
+    """
+    # shallow copy indexed by position
+    frame = pd.DataFrame(df).copy(deep=False)
+    del frame[df._geometry_column_name]
+    frame.index = range(len(frame))
+    taken = frame.reindex(idx)
+    taken.index = range(len(idx))
+    return taken
+
 
+def _overlay_frame(df1, df2, idx1, idx2, geometries):
+    """
+    GeoDataFrame with the columns of ``df1`` and ``df2`` (the geometry
+    columns excepted) at positions ``idx1`` and ``idx2`` (-1 for missing
+    values), and ``geometries``.
+    """
+    frame = pd.concat([_take_attributes(df1, idx1),
+                       _take_attributes(df2, idx2)], axis=1)
+    frame.columns = _uniquify(list(frame.columns))
+    # a column named 'geometry' is replaced by the new geometries
+    frame['geometry'] = geometries
+    return GeoDataFrame(frame, crs=df1.crs)
 
-def overlay(df1, df2, how, use_sindex=True):
+
+def overlay(df1, df2, how, use_sindex=True, tile_size=None, n_jobs=1,
+            executor=None, make_valid=True):
     """Perform spatial overlay between two polygons.
 
     Currently only supports data GeoDataFrames with polygons.
     Implements several methods that are all effectively subsets of
     the union.
 
+    The pairs of polygons with intersecting bounding boxes are found with a
+    bulk query of the spatial index of ``df2``. Only these pairs are
+    intersected, and each polygon is only differenced with the union of
+    its own candidates. The result has a row for each pair with a
+    polygonal intersection (for 'intersection', 'union' and 'identity'),
+    followed by the remainder of each polygon of ``df1`` (for 'union',
+    'identity', 'symmetric_difference' and 'difference') and of ``df2``
+    (for 'union' and 'symmetric_difference'), if not empty.
+
+    With ``tile_size``, the polygons of each frame are overlaid in tiles of
+    neighbouring polygons, so that only the candidate pairs and the
+    intermediate geometries of one tile are held in memory at a time. A
+    polygon straddling several tiles of the other frame belongs to a single
+    tile of its own frame, where it meets all its candidates. The result is
+    the same as without tiles.
+
+    With ``n_jobs`` > 1 the tiles are overlaid concurrently, a few tiles per
+    job being submitted at a time. Each task only receives the polygons of
+    its tile and their candidates, and the result is exactly the same as
+    the serial overlay.
+
     Parameters
     ----------
     df1 : GeoDataFrame with MultiPolygon or Polygon geometry column
@@ -72,6 +246,20 @@ def overlay(df1, df2, how, use_sindex=True):
         'identity', 'symmetric_difference' or 'difference'.
     use_sindex : boolean, default True
         Use the spatial index to speed up operation if available.
+    tile_size : int, optional
+        Maximum number of polygons of each frame overlaid at a time. By
+        default all polygons are overlaid at once, or in ``n_jobs`` tiles.
+    n_jobs : int, default 1
+        Number of tiles overlaid concurrently (-1 for the number of CPUs).
+    executor : object with a ``map`` method, optional
+        Executor overlaying the tiles, e.g. a
+        ``concurrent.futures.ProcessPoolExecutor``. By default a thread pool
+        with ``n_jobs`` threads is used (GEOS releases the GIL).
+    make_valid : boolean, default True
+        Fix the invalid polygons with ``buffer(0)`` before the overlay. The
+        validity of the polygons of a frame is checked once and cached with
+        its geometries (see ``is_valid``). If False, the polygons are
+        assumed to be valid and are not checked.
 
     Returns
     -------
@@ -95,84 +283,70 @@ def overlay(df1, df2, how, use_sindex=True):
     if isinstance(df1, GeoSeries) or isinstance(df2, GeoSeries):
         raise NotImplementedError("overlay currently only implemented for GeoDataFrames")
 
-    # Collect the interior and exterior rings
-    rings1 = _extract_rings(df1)
-    rings2 = _extract_rings(df2)
-    mls1 = MultiLineString(rings1)
-    mls2 = MultiLineString(rings2)
-
-    # Union and polygonize
-    mm = unary_union([mls1, mls2])
-    newpolys = polygonize(mm)
-
-    # determine spatial relationship
-    collection = []
-    for fid, newpoly in enumerate(newpolys):
-        cent = newpoly.representative_point()
-
-        # Test intersection with original polys
-        # FIXME there should be a higher-level abstraction to search by bounds
-        # and fall back in the case of no index?
-        if use_sindex and df1.sindex is not None:
-            candidates1 = [x.object for x in
-                           df1.sindex.intersection(newpoly.bounds, objects=True)]
-        else:
-            candidates1 = [i for i, x in df1.iterrows()]
-
-        if use_sindex and df2.sindex is not None:
-            candidates2 = [x.object for x in
-                           df2.sindex.intersection(newpoly.bounds, objects=True)]
-        else:
-            candidates2 = [i for i, x in df2.iterrows()]
-
-        df1_hit = False
-        df2_hit = False
-        prop1 = None
-        prop2 = None
-        for cand_id in candidates1:
-            cand = df1.loc[cand_id]
-            if cent.intersects(cand[df1.geometry.name]):
-                df1_hit = True
-                prop1 = cand
-                break  # Take the first hit
-        for cand_id in candidates2:
-            cand = df2.loc[cand_id]
-            if cent.intersects(cand[df2.geometry.name]):
-                df2_hit = True
-                prop2 = cand
-                break  # Take the first hit
-
-        # determine spatial relationship based on type of overlay
-        hit = False
-        if how == "intersection" and (df1_hit and df2_hit):
-            hit = True
-        elif how == "union" and (df1_hit or df2_hit):
-            hit = True
-        elif how == "identity" and df1_hit:
-            hit = True
-        elif how == "symmetric_difference" and not (df1_hit and df2_hit):
-            hit = True
-        elif how == "difference" and (df1_hit and not df2_hit):
-            hit = True
-
-        if not hit:
-            continue
-
-        # gather properties
-        if prop1 is None:
-            prop1 = pd.Series(dict.fromkeys(df1.columns, None))
-        if prop2 is None:
-            prop2 = pd.Series(dict.fromkeys(df2.columns, None))
-
-        # Concat but don't retain the original geometries
-        out_series = pd.concat([prop1.drop(df1._geometry_column_name),
-                                prop2.drop(df2._geometry_column_name)])
-
-        out_series.index = _uniquify(out_series.index)
-
-        # Create a geoseries and add it to the collection
-        out_series['geometry'] = newpoly
-        collection.append(out_series)
-
-    # Return geodataframe with new indices
-    return GeoDataFrame(collection, index=range(len(collection)))
+    if tile_size is not None and tile_size < 1:
+        raise ValueError("tile_size should be a positive integer")
+    n_jobs = _n_jobs(n_jobs)
+
+    geoms1 = _polygonal_geometries(df1, make_valid)
+    geoms2 = _polygonal_geometries(df2, make_valid)
+    keep_intersection = how in ('intersection', 'union', 'identity')
+    keep_difference1 = how in ('union', 'identity', 'symmetric_difference',
+                               'difference')
+    keep_difference2 = how in ('union', 'symmetric_difference')
+    tiles1 = _tiles(df1, tile_size, n_jobs)
+    tiles2 = _tiles(df2, tile_size, n_jobs) if keep_difference2 else []
+    # with a single tile on both sides, all the pairs are known at once and
+    # the index of df1 is not needed
+    single_tile = len(tiles1) == 1 and len(tiles2) == 1
+
+    def tasks():
+        # generated lazily, so that the serial overlay holds a single tile
+        for rows1 in tiles1:
+            idx1, idx2 = _candidate_pairs(df1, df2, rows1, use_sindex)
+            yield _tile_task(geoms1, geoms2, rows1, idx1, idx2, 1,
+                             keep_intersection, keep_difference1)
+            if single_tile:
+                order = np.lexsort((idx1, idx2))
+                yield _tile_task(geoms2, geoms1, tiles2[0], idx2[order],
+                                 idx1[order], 2, False, True)
+        if not single_tile:
+            for rows2 in tiles2:
+                idx2, idx1 = _candidate_pairs(df2, df1, rows2, use_sindex)
+                yield _tile_task(geoms2, geoms1, rows2, idx2, idx1, 2, False,
+                                 True)
+
+    intersections, differences1, differences2 = [], [], []
+    for side, tile_intersections, tile_differences in _map(
+            _overlay_tile, tasks(), n_jobs, executor):
+        if tile_intersections is not None:
+            intersections.append(tile_intersections)
+        if tile_differences is not None:
+            if side == 1:
+                differences1.append(tile_differences)
+            else:
+                differences2.append(tile_differences)
+
+    # stitch the tiles in the order of the rows of df1 and df2
+    empty = np.empty(0, dtype='int64')
+    out1, out2, geometries = [empty], [empty], [np.empty(0, dtype=object)]
+    if intersections:
+        idx1, idx2, data = [np.concatenate(part)
+                            for part in zip(*intersections)]
+        order = np.lexsort((idx2, idx1))
+        out1.append(idx1[order])
+        out2.append(idx2[order])
+        geometries.append(data[order])
+    if differences1:
+        pos1, data = [np.concatenate(part) for part in zip(*differences1)]
+        order = np.argsort(pos1, kind='mergesort')
+        out1.append(pos1[order])
+        out2.append(-np.ones(len(pos1), dtype='int64'))
+        geometries.append(data[order])
+    if differences2:
+        pos2, data = [np.concatenate(part) for part in zip(*differences2)]
+        order = np.argsort(pos2, kind='mergesort')
+        out1.append(-np.ones(len(pos2), dtype='int64'))
+        out2.append(pos2[order])
+        geometries.append(data[order])
+    return _overlay_frame(df1, df2, np.concatenate(out1),
+                          np.concatenate(out2), np.concatenate(geometries))
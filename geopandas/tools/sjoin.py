@@ -1,12 +1,16 @@
+from collections import OrderedDict
 from warnings import warn
 
 import numpy as np
 import pandas as pd
-from shapely import prepared
+
+from geopandas._parallel import _map, _n_jobs
+from geopandas.sindex import INVERSE_PREDICATES, SpatialIndex, _str_order
 
 
 def sjoin(left_df, right_df, how='inner', op='intersects',
-          lsuffix='left', rsuffix='right'):
+          lsuffix='left', rsuffix='right', index_side=None, n_jobs=1,
+          executor=None, distance=None):
     """Spatial join of two GeoDataFrames.
 
     Parameters
@@ -20,25 +24,54 @@ def sjoin(left_df, right_df, how='inner', op='intersects',
         * 'inner': use intersection of keys from both dfs; retain only
           left_df geometry column
     op : string, default 'intersection'
-        Binary predicate, one of {'intersects', 'contains', 'within'}.
+        Binary predicate, one of {'intersects', 'contains', 'within',
+        'touches', 'crosses', 'overlaps', 'covers', 'covered_by',
+        'dwithin'}. 'dwithin' joins the rows whose geometries are within
+        ``distance`` of each other.
         See http://toblerity.org/shapely/manual.html#binary-predicates.
     lsuffix : string, default 'left'
         Suffix to apply to overlapping column names (left GeoDataFrame).
     rsuffix : string, default 'right'
         Suffix to apply to overlapping column names (right GeoDataFrame).
+    index_side : string, optional
+        The frame whose spatial index is queried with the geometries of the
+        other frame, 'left' or 'right'. By default, a frame that already has
+        a spatial index (built before, or saved next to the file it was
+        read from) is used, otherwise the index is built on the frame with
+        the fewest rows. This does not change the result.
+    n_jobs : int, default 1
+        Number of chunks the other frame is split into to query the spatial
+        index concurrently (-1 for the number of CPUs). The chunks are
+        spatially coherent, so each of them only visits a part of the tree.
+    executor : object with a ``map`` method, optional
+        Executor running the chunks, e.g. a
+        ``concurrent.futures.ProcessPoolExecutor``. Each chunk is then sent
+        with its candidate indexed geometries only, not with the whole
+        spatial index. By default a thread pool with ``n_jobs`` threads is
+        used. The result does not depend on the number of chunks or the
+        order in which they complete.
+    distance : float, optional
+        The distance for ``op='dwithin'``.
 
     """
-    import rtree
-
     allowed_hows = ['left', 'right', 'inner']
     if how not in allowed_hows:
         raise ValueError("`how` was \"%s\" but is expected to be in %s" %
                          (how, allowed_hows))
 
-    allowed_ops = ['contains', 'within', 'intersects']
+    allowed_sides = [None, 'left', 'right']
+    if index_side not in allowed_sides:
+        raise ValueError("`index_side` was \"%s\" but is expected to be in "
+                         "%s" % (index_side, allowed_sides))
+
+    allowed_ops = ['contains', 'within', 'intersects', 'touches', 'crosses',
+                   'overlaps', 'covers', 'covered_by', 'dwithin']
     if op not in allowed_ops:
         raise ValueError("`op` was \"%s\" but is expected to be in %s" %
                          (op, allowed_ops))
+    if (op == 'dwithin') != (distance is not None):
+        raise ValueError("`distance` is required for op='dwithin', and only "
+                         "valid for it")
 
     if left_df.crs != right_df.crs:
         warn('CRS of frames being joined does not match!')
@@ -52,109 +85,280 @@ def sjoin(left_df, right_df, how='inner', op='intersects',
         raise ValueError("'{0}' and '{1}' cannot be names in the frames being"
                          " joined".format(index_left, index_right))
 
-    # the rtree spatial index only allows limited (numeric) index types, but an
-    # index in geopandas may be any arbitrary dtype. so reset both indices now
-    # and store references to the original indices, to be reaffixed later.
-    # GH 352
-    left_df = left_df.copy(deep=True)
-    left_df.index = left_df.index.rename(index_left)
-    left_df = left_df.reset_index()
-    right_df = right_df.copy(deep=True)
-    right_df.index = right_df.index.rename(index_right)
-    right_df = right_df.reset_index()
-
-    if op == "within":
-        # within implemented as the inverse of contains; swap names
-        left_df, right_df = right_df, left_df
-
-    # insert the bounds in the rtree spatial index
-    right_df_bounds = right_df.geometry.apply(lambda x: x.bounds)
-    stream = ((i, b, None) for i, b in enumerate(right_df_bounds))
-    tree_idx = rtree.index.Index(stream)
-
-    idxmatch = (left_df.geometry.apply(lambda x: x.bounds)
-                .apply(lambda x: list(tree_idx.intersection(x))))
-    idxmatch = idxmatch[idxmatch.apply(len) > 0]
-
-    if idxmatch.shape[0] > 0:
-        # if output from join has overlapping geometries
-        r_idx = np.concatenate(idxmatch.values)
-        l_idx = np.concatenate([[i] * len(v) for i, v in idxmatch.iteritems()])
-
-        # Vectorize predicate operations
-        def find_intersects(a1, a2):
-            return a1.intersects(a2)
-
-        def find_contains(a1, a2):
-            return a1.contains(a2)
-
-        predicate_d = {'intersects': find_intersects,
-                       'contains': find_contains,
-                       'within': find_contains}
-
-        check_predicates = np.vectorize(predicate_d[op])
-
-        result = (
-                  pd.DataFrame(
-                      np.column_stack(
-                          [l_idx,
-                           r_idx,
-                           check_predicates(
-                               left_df.geometry
-                               .apply(lambda x: prepared.prep(x))[l_idx],
-                               right_df[right_df.geometry.name][r_idx])
-                           ]))
-                   )
-
-        result.columns = ['_key_left', '_key_right', 'match_bool']
-        result = (
-                  pd.DataFrame(result[result['match_bool']==1])
-                  .drop('match_bool', axis=1)
-                  )
+    # positions of the matching rows, from a single bulk query of the
+    # spatial index of one frame refined with the exact predicate
+    if index_side is None:
+        index_side = _choose_index_side(left_df, right_df)
+    if index_side == 'right':
+        l_idx, r_idx = _query_pairs(right_df, left_df, op, distance,
+                                    n_jobs=n_jobs, executor=executor)
+    else:
+        r_idx, l_idx = _query_pairs(left_df, right_df,
+                                    INVERSE_PREDICATES[op], distance,
+                                    n_jobs=n_jobs, executor=executor)
+
+    # the matches in the order of the left rows
+    order = np.lexsort((r_idx, l_idx))
+    l_idx, r_idx = l_idx[order], r_idx[order]
+    if how == 'left':
+        l_idx, r_idx = _with_unmatched(l_idx, r_idx, len(left_df))
+    elif how == 'right':
+        # followed by the right rows without a match, as a right merge
+        missing = np.setdiff1d(np.arange(len(right_df)), r_idx)
+        r_idx = np.concatenate([r_idx, missing])
+        l_idx = np.concatenate([l_idx,
+                                -np.ones(len(missing), dtype='int64')])
+
+    return _join_frames(left_df, right_df, l_idx, r_idx, how, lsuffix,
+                        rsuffix)
+
+
+def _has_sindex(df):
+    """Whether the spatial index of ``df`` is available without building
+    it from scratch."""
+    return df._sindex_generated or df._sindex_file is not None
+
+
+def _choose_index_side(left_df, right_df):
+    """
+    The frame to build (or reuse) the spatial index of in a join: a frame
+    that already has one, otherwise the smallest frame, which is the
+    cheapest to index and the fastest to query with the larger one.
+    """
+    has_left, has_right = _has_sindex(left_df), _has_sindex(right_df)
+    if has_left != has_right:
+        return 'left' if has_left else 'right'
+    return 'left' if len(left_df) < len(right_df) else 'right'
+
+
+def _query_chunk(args):
+    """Query one chunk of geometries (module level to be picklable)."""
+    sindex, geometries, predicate, distance = args
+    return sindex.query_bulk(geometries, predicate=predicate,
+                             distance=distance)
+
+
+def _query_candidates(args):
+    """
+    Query one chunk of geometries against its candidate indexed geometries
+    (at ``positions`` in the indexed frame, with bounds ``bounds``), which
+    are indexed anew: the chunk does not carry the whole spatial index.
+    """
+    geometries, candidates, bounds, positions, predicate, distance = args
+    sindex = SpatialIndex(bounds, geometries=candidates)
+    input_idx, tree_idx = sindex.query_bulk(geometries, predicate=predicate,
+                                            distance=distance)
+    return input_idx, positions[tree_idx]
+
+
+def _candidates_task(sindex, geometries, bounds, predicate, distance):
+    """
+    Arguments of ``_query_candidates`` for the ``geometries`` of a chunk
+    (with bounds ``bounds``): the indexed geometries whose bounds intersect
+    those of the chunk (enlarged by ``distance``).
+    """
+    if distance is not None:
+        bounds = bounds + np.array([-distance, -distance, distance, distance])
+    positions = np.unique(sindex.intersection_bulk(bounds)[1])
+    return (geometries, sindex.geometries.take(positions),
+            sindex._leaf_bounds(positions), positions, predicate, distance)
+
+
+def _query_pairs(df, other, predicate, distance=None, n_jobs=1,
+                 executor=None):
+    """
+    Positions in ``other`` and ``df`` of the pairs of geometries for which
+    ``predicate(other geometry, df geometry)`` holds (with ``distance``
+    for 'dwithin'), using the spatial index of ``df``.
+
+    With ``n_jobs`` > 1 the geometries of ``other`` are split in ``n_jobs``
+    chunks of neighbouring geometries (runs of their Sort-Tile-Recursive
+    order), which are queried concurrently with ``executor`` or a thread
+    pool. The pairs are then in no particular order.
+    """
+    n_jobs = _n_jobs(n_jobs)
+    sindex = df.sindex
+    if sindex is None:
+        empty = np.empty(0, dtype='int64')
+        return empty, empty
+    n_chunks = min(n_jobs, len(other))
+    if n_chunks <= 1:
+        return sindex.query_bulk(other, predicate=predicate,
+                                 distance=distance)
+
+    bounds = other._geometry_bounds
+    valid = np.flatnonzero(~np.isnan(bounds).any(axis=1))
+    size = max(-(-len(valid) // n_chunks), 1)
+    order = valid[_str_order(bounds[valid], size)]
+    chunks = [order[start:start + size]
+              for start in range(0, len(order), size)]
+    if not chunks:
+        empty = np.empty(0, dtype='int64')
+        return empty, empty
+    geometries = other._geometry_array
+    if executor is None:
+        # the threads share the spatial index
+        tasks = [(sindex, geometries.take(chunk), predicate, distance)
+                 for chunk in chunks]
+        results = list(_map(_query_chunk, tasks, len(tasks)))
+    else:
+        tasks = [_candidates_task(sindex, geometries.take(chunk),
+                                  bounds[chunk], predicate, distance)
+                 for chunk in chunks]
+        results = list(_map(_query_candidates, tasks, len(tasks), executor))
+    # _map keeps the order of the chunks
+    input_idx = np.concatenate([chunk[res[0]]
+                                for chunk, res in zip(chunks, results)])
+    tree_idx = np.concatenate([res[1] for res in results])
+    return input_idx, tree_idx
+
+
+def _take_column(values, idx):
+    """Values at the positions ``idx``, missing (NaN) at the -1 entries."""
+    if len(idx) and idx.min() < 0:
+        return pd.Series(values).reindex(idx).values
+    return values.take(idx)
+
+
+def _join_frames(left_df, right_df, l_idx, r_idx, how, lsuffix, rsuffix):
+    """
+    Assemble the result of a spatial join from the positions of the joined
+    rows in both frames, with a single take per column.
+
+    ``l_idx`` (for how='left') or ``r_idx`` (for how='right') can contain
+    -1 for rows without a match. The geometry and the index come from the
+    right frame for how='right', otherwise from the left frame.
+
+    The input frames are not copied: only the columns of the result are
+    allocated, so the memory used stays close to the size of the inputs
+    plus the size of the result.
+    """
+    from geopandas import GeoDataFrame
+
+    index_left = 'index_%s' % lsuffix
+    index_right = 'index_%s' % rsuffix
+    left_geom = left_df._geometry_column_name
+    right_geom = right_df._geometry_column_name
+    left_cols = [(k, col) for k, col in enumerate(left_df.columns)
+                 if how != 'right' or col != left_geom]
+    right_cols = [(k, col) for k, col in enumerate(right_df.columns)
+                  if how == 'right' or col != right_geom]
+    overlap = (set(col for _, col in left_cols) &
+               set(col for _, col in right_cols))
+
+    def name(col, suffix):
+        return '%s_%s' % (col, suffix) if col in overlap else col
 
+    # the columns are taken by position, so that the frames do not need a
+    # unique or resettable index
+    data = OrderedDict()
+    for k, col in left_cols:
+        data[name(col, lsuffix)] = _take_column(
+            left_df.iloc[:, k].values, l_idx)
+    if how == 'right':
+        data[index_left] = _take_column(np.asarray(left_df.index), l_idx)
     else:
-        # when output from the join has no overlapping geometries
-        result = pd.DataFrame(columns=['_key_left', '_key_right'])
-
-    if op == "within":
-        # within implemented as the inverse of contains; swap names
-        left_df, right_df = right_df, left_df
-        result = result.rename(columns={'_key_left': '_key_right',
-                                        '_key_right': '_key_left'})
-
-
-    if how == 'inner':
-        result = result.set_index('_key_left')
-        joined = (
-                  left_df
-                  .merge(result, left_index=True, right_index=True)
-                  .merge(right_df.drop(right_df.geometry.name, axis=1),
-                      left_on='_key_right', right_index=True,
-                      suffixes=('_%s' % lsuffix, '_%s' % rsuffix))
-                 )
-        joined = joined.set_index(index_left).drop(['_key_right'], axis=1)
-        joined.index.name = None
-    elif how == 'left':
-        result = result.set_index('_key_left')
-        joined = (
-                  left_df
-                  .merge(result, left_index=True, right_index=True, how='left')
-                  .merge(right_df.drop(right_df.geometry.name, axis=1),
-                      how='left', left_on='_key_right', right_index=True,
-                      suffixes=('_%s' % lsuffix, '_%s' % rsuffix))
-                 )
-        joined = joined.set_index(index_left).drop(['_key_right'], axis=1)
-        joined.index.name = None
-    else:  # how == 'right':
-        joined = (
-                  left_df
-                  .drop(left_df.geometry.name, axis=1)
-                  .merge(result.merge(right_df,
-                      left_on='_key_right', right_index=True,
-                      how='right'), left_index=True,
-                      right_on='_key_left', how='right')
-                  .set_index(index_right)
-                 )
-        joined = joined.drop(['_key_left', '_key_right'], axis=1)
+        data[index_right] = _take_column(np.asarray(right_df.index), r_idx)
+    for k, col in right_cols:
+        data[name(col, rsuffix)] = _take_column(
+            right_df.iloc[:, k].values, r_idx)
 
+    if how == 'right':
+        index = right_df.index.take(r_idx).rename(index_right)
+        geometry, crs = name(right_geom, rsuffix), right_df.crs
+    else:
+        index = left_df.index.take(l_idx).rename(None)
+        geometry, crs = name(left_geom, lsuffix), left_df.crs
+    joined = GeoDataFrame(data, index=index, columns=list(data))
+    # the geometry column is taken from a GeoDataFrame (without missing
+    # rows), so set_geometry would only validate and copy it again
+    joined._geometry_column_name = geometry
+    joined.crs = crs
     return joined
+
+
+def sjoin_nearest(left_df, right_df, how='inner', k=1, max_distance=None,
+                  lsuffix='left', rsuffix='right', distance_col=None):
+    """Spatial join of two GeoDataFrames based on the distance between
+    their geometries.
+
+    Each row of ``left_df`` is joined with the ``k`` nearest rows of
+    ``right_df`` (for how='right', each row of ``right_df`` with the ``k``
+    nearest rows of ``left_df``), using the spatial index of the other
+    frame.
+
+    Parameters
+    ----------
+    left_df, right_df : GeoDataFrames
+    how : string, default 'inner'
+        The type of join:
+
+        * 'left': use keys from left_df; retain only left_df geometry column
+        * 'right': use keys from right_df; retain only right_df geometry
+          column
+        * 'inner': use intersection of keys from both dfs; retain only
+          left_df geometry column
+    k : int, default 1
+        Number of nearest neighbours to join. Of rows at equal distance,
+        the first ones are used.
+    max_distance : float, optional
+        Maximum distance within which to look for neighbours.
+    lsuffix : string, default 'left'
+        Suffix to apply to overlapping column names (left GeoDataFrame).
+    rsuffix : string, default 'right'
+        Suffix to apply to overlapping column names (right GeoDataFrame).
+    distance_col : string, optional
+        If given, the distances are added to the result in a column with
+        this name.
+
+    """
+    allowed_hows = ['left', 'right', 'inner']
+    if how not in allowed_hows:
+        raise ValueError("`how` was \"%s\" but is expected to be in %s" %
+                         (how, allowed_hows))
+
+    if left_df.crs != right_df.crs:
+        warn('CRS of frames being joined does not match!')
+
+    if how == 'right':
+        r_idx, l_idx, dist = _nearest(right_df, left_df, k, max_distance)
+        r_idx, l_idx, dist = _with_unmatched(r_idx, l_idx, len(right_df),
+                                             dist)
+    else:
+        l_idx, r_idx, dist = _nearest(left_df, right_df, k, max_distance)
+        if how == 'left':
+            l_idx, r_idx, dist = _with_unmatched(l_idx, r_idx, len(left_df),
+                                                 dist)
+
+    joined = _join_frames(left_df, right_df, l_idx, r_idx, how, lsuffix,
+                          rsuffix)
+    if distance_col is not None:
+        joined[distance_col] = dist
+    return joined
+
+
+def _nearest(df, other, k, max_distance):
+    """Positions in ``df`` and ``other`` of the nearest neighbours in
+    ``other`` of each row of ``df``, and their distances."""
+    sindex = other.sindex
+    if sindex is None:
+        empty = np.empty(0, dtype='int64')
+        return empty, empty, np.empty(0)
+    return sindex.nearest(df, k=k, max_distance=max_distance)
+
+
+def _with_unmatched(idx, other_idx, n, dist=None):
+    """
+    Add a row with -1 in ``other_idx`` (and NaN in ``dist``, if given) for
+    each of the ``n`` positions missing in ``idx`` (sorted), keeping
+    ``idx`` sorted.
+    """
+    missing = np.setdiff1d(np.arange(n), idx)
+    idx = np.concatenate([idx, missing])
+    other_idx = np.concatenate([other_idx,
+                                -np.ones(len(missing), dtype='int64')])
+    order = np.argsort(idx, kind='mergesort')
+    if dist is None:
+        return idx[order], other_idx[order]
+    dist = np.concatenate([dist, np.full(len(missing), np.nan)])
+    return idx[order], other_idx[order], dist[order]
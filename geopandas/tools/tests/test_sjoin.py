@@ -4,11 +4,14 @@ from distutils.version import LooseVersion
 
 import numpy as np
 import pandas as pd
-from shapely.geometry import Point, Polygon
+from shapely.geometry import LineString, Point, Polygon
+from shapely.geometry.base import BaseGeometry
 
 import geopandas
-from geopandas import GeoDataFrame, GeoSeries, read_file, base
-from geopandas import sjoin
+from geopandas import GeoDataFrame, GeoSeries, read_file
+from geopandas import sjoin, sjoin_nearest
+from geopandas.sindex import SpatialIndex
+from geopandas.tests.util import RecordingExecutor
 
 import pytest
 from pandas.util.testing import assert_frame_equal
@@ -65,7 +68,6 @@ def dfs(request):
     return [request.param, df1, df2, expected]
 
 
-@pytest.mark.skipif(not base.HAS_SINDEX, reason='Rtree absent, skipping')
 class TestSpatialJoin:
 
     @pytest.mark.parametrize('dfs', ['default-index', 'string-index'],
@@ -137,8 +139,70 @@ class TestSpatialJoin:
 
         assert_frame_equal(res, exp, check_index_type=False)
 
+    @pytest.mark.parametrize('dfs', ['default-index', 'string-index'],
+                             indirect=True)
+    @pytest.mark.parametrize('op', ['intersects', 'contains', 'within'])
+    @pytest.mark.parametrize('how', ['left', 'right', 'inner'])
+    def test_index_side(self, how, op, dfs):
+        index, df1, df2, expected = dfs
+
+        exp = sjoin(df1, df2, how=how, op=op, index_side='right')
+        res = sjoin(df1, df2, how=how, op=op, index_side='left')
+        assert_frame_equal(res, exp)
+
+    @pytest.mark.parametrize('how', ['left', 'right', 'inner'])
+    def test_layout(self, how):
+        # rows in the order of the left rows, then of the matched right rows
+        left = GeoDataFrame({'a': [1, 2, 3], 'name': list('xyz')},
+                            geometry=[Point(5, 5), Point(1, 3),
+                                      Point(20, 20)],
+                            index=[10, 30, 20])
+        right = GeoDataFrame({'b': [1, 2, 3], 'name': list('uvw')},
+                             geometry=[Polygon([(0, 0), (10, 0), (10, 10)]),
+                                       Polygon([(0, 0), (6, 0), (6, 6),
+                                                (0, 6)]),
+                                       Polygon([(50, 50), (60, 50),
+                                                (60, 60)])],
+                             index=list('cba'))
+        res = sjoin(left, right, how=how)
+        if how == 'right':
+            assert list(res.columns) == ['a', 'name_left', 'index_left', 'b',
+                                         'name_right', 'geometry']
+            assert list(res.index) == ['c', 'b', 'b', 'a']
+            assert res.index.name == 'index_right'
+            assert res['index_left'].tolist()[:3] == [10, 10, 30]
+            assert np.isnan(res['index_left'].iloc[3])
+        else:
+            assert list(res.columns) == ['a', 'name_left', 'geometry',
+                                         'index_right', 'b', 'name_right']
+            expected = [(10, 'c'), (10, 'b'), (30, 'b')]
+            assert list(zip(res.index, res['index_right']))[:3] == expected
+            if how == 'left':
+                assert res.index[3] == 20
+                assert pd.isnull(res['index_right'].iloc[3])
+            else:
+                assert len(res) == 3
+
+    def test_index_side_choice(self):
+        small = GeoDataFrame(geometry=[Point(0, 0)])
+        large = GeoDataFrame(geometry=[Point(i, i) for i in range(10)])
+        res = sjoin(small, large)
+        assert small._sindex_generated is True
+        assert large._sindex_generated is False
+
+        large = GeoDataFrame(geometry=[Point(i, i) for i in range(10)])
+        large.sindex
+        small = GeoDataFrame(geometry=[Point(0, 0)])
+        sjoin(small, large)
+        assert small._sindex_generated is False
+        assert_frame_equal(sjoin(small, large, index_side='left'), res)
+
+    def test_invalid_index_side(self):
+        df = GeoDataFrame(geometry=[Point(0, 0)])
+        with pytest.raises(ValueError):
+            sjoin(df, df, index_side='both')
+
 
-@pytest.mark.skipif(not base.HAS_SINDEX, reason='Rtree absent, skipping')
 class TestSpatialJoinNYBB:
 
     def setup_method(self):
@@ -197,6 +261,49 @@ class TestSpatialJoinNYBB:
         assert df.shape == (21, 8)
         assert np.isnan(df.loc[1]['Shape_Area'])
 
+    @pytest.mark.parametrize('op', ['intersects', 'contains', 'within',
+                                    'touches', 'crosses', 'overlaps',
+                                    'covers', 'covered_by', 'dwithin'])
+    def test_sjoin_pairs(self, op):
+        polydf = self.polydf.copy()
+        polydf.geometry = polydf.buffer(-5000)
+        points = self.pointdf.append(GeoDataFrame(
+            {'pointattr1': [0], 'pointattr2': [0]}, geometry=[None]),
+            ignore_index=True)
+        lines = GeoDataFrame(geometry=[
+            LineString([p.coords[0], q.coords[0]])
+            for p, q in zip(self.pointdf.geometry[:-1],
+                            self.pointdf.geometry[1:])])
+        if op == 'dwithin':
+            kwargs = {'distance': 10000}
+
+            def func(geom, other):
+                return geom.distance(other) <= 10000
+        elif op == 'covered_by':
+            kwargs = {}
+
+            def func(geom, other):
+                return other.covers(geom)
+        else:
+            kwargs = {}
+            func = getattr(BaseGeometry, op)
+        frames = [points, polydf, lines]
+        for left in frames:
+            for right in frames:
+                df = sjoin(left, right, how='inner', op=op, **kwargs)
+                expected = [(i, j)
+                            for i, g in zip(left.index, left.geometry)
+                            for j, h in zip(right.index, right.geometry)
+                            if g is not None and h is not None and
+                            func(g, h)]
+                assert list(zip(df.index, df['index_right'])) == expected
+
+    def test_sjoin_dwithin_distance(self):
+        with pytest.raises(ValueError):
+            sjoin(self.pointdf, self.polydf, op='dwithin')
+        with pytest.raises(ValueError):
+            sjoin(self.pointdf, self.polydf, distance=100)
+
     def test_sjoin_bad_op(self):
         # AttributeError: 'Point' object has no attribute 'spandex'
         with pytest.raises(ValueError):
@@ -217,6 +324,58 @@ class TestSpatialJoinNYBB:
         assert pointdf2.index.name == 'pointid'
         assert self.polydf.index.name == None
 
+    @pytest.mark.parametrize('how', ['left', 'right', 'inner'])
+    def test_sjoin_inputs_unchanged(self, how):
+        pointdf = self.pointdf.copy()
+        polydf = self.polydf.copy()
+        df = sjoin(self.pointdf, self.polydf, how=how)
+        assert_frame_equal(self.pointdf, pointdf)
+        assert_frame_equal(self.polydf, polydf)
+        assert df.crs == self.crs
+        assert df.geometry.name == 'geometry'
+        expected = 'Point' if how != 'right' else 'MultiPolygon'
+        assert (df.geom_type == expected).all()
+
+    @pytest.mark.parametrize('how', ['left', 'right', 'inner'])
+    @pytest.mark.parametrize('op', ['intersects', 'contains', 'within'])
+    def test_sjoin_n_jobs(self, how, op):
+        expected = sjoin(self.pointdf, self.polydf, how=how, op=op)
+        for n_jobs in [2, 3, -1]:
+            for index_side in ['left', 'right']:
+                res = sjoin(self.pointdf, self.polydf, how=how, op=op,
+                            index_side=index_side, n_jobs=n_jobs)
+                assert_frame_equal(res, expected)
+
+        executor = RecordingExecutor()
+        res = sjoin(self.pointdf, self.polydf, how=how, op=op,
+                    index_side='right', n_jobs=4, executor=executor)
+        assert len(executor.tasks) == 4
+        assert_frame_equal(res, expected)
+        # the chunks only carry their candidate polygons, not the index
+        for task in executor.tasks:
+            assert not any(isinstance(arg, SpatialIndex) for arg in task)
+            assert len(task[1]) <= len(self.polydf)
+
+        if op == 'intersects':
+            # candidates within a distance of the chunks
+            expected = sjoin(self.pointdf, self.polydf, how=how, op='dwithin',
+                             distance=5000)
+            res = sjoin(self.pointdf, self.polydf, how=how, op='dwithin',
+                        distance=5000, index_side='right', n_jobs=4,
+                        executor=RecordingExecutor())
+            assert_frame_equal(res, expected)
+
+        with pytest.raises(ValueError):
+            sjoin(self.pointdf, self.polydf, n_jobs=0)
+
+    def test_sjoin_process_pool(self):
+        futures = pytest.importorskip('concurrent.futures')
+        expected = sjoin(self.pointdf, self.polydf)
+        with futures.ProcessPoolExecutor(2) as executor:
+            res = sjoin(self.pointdf, self.polydf, n_jobs=2,
+                        executor=executor)
+        assert_frame_equal(res, expected)
+
     def test_sjoin_values(self):
         # GH190
         self.polydf.index = [1, 3, 4, 5, 6]
@@ -227,7 +386,6 @@ class TestSpatialJoinNYBB:
 
     @pytest.mark.skipif(str(pd.__version__) < LooseVersion('0.19'),
                         reason=pandas_0_18_problem)
-    @pytest.mark.xfail
     def test_no_overlapping_geometry(self):
         # Note: these tests are for correctly returning GeoDataFrame
         # when result of the join is empty
@@ -282,3 +440,49 @@ class TestSpatialJoinNYBB:
     def test_sjoin_outer(self):
         df = sjoin(self.pointdf, self.polydf, how="outer")
         assert df.shape == (21, 8)
+
+
+class TestSpatialJoinNearest:
+
+    def setup_method(self):
+        self.points = GeoDataFrame(
+            {'a': [1, 2, 3], 'value': [10, 20, 30]},
+            geometry=[Point(0, 0), Point(5, 0), Point(20, 20)],
+            index=['p', 'q', 'r'])
+        self.lines = GeoDataFrame(
+            {'b': ['x', 'y'], 'value': [1.5, 2.5]},
+            geometry=[LineString([(0, 1), (6, 1)]),
+                      LineString([(5, 3), (5, 8)])])
+
+    def test_inner(self):
+        res = sjoin_nearest(self.points, self.lines, distance_col='dist')
+        assert list(res.index) == ['p', 'q', 'r']
+        assert list(res.columns) == ['a', 'value_left', 'geometry',
+                                     'index_right', 'b', 'value_right',
+                                     'dist']
+        assert list(res['index_right']) == [0, 0, 1]
+        assert list(res['dist']) == [1, 1, Point(20, 20).distance(
+            Point(5, 8))]
+        assert res.geometry.name == 'geometry'
+
+    def test_max_distance(self):
+        res = sjoin_nearest(self.points, self.lines, max_distance=2)
+        assert list(res.index) == ['p', 'q']
+
+        res = sjoin_nearest(self.points, self.lines, how='left',
+                            max_distance=2)
+        assert list(res.index) == ['p', 'q', 'r']
+        assert np.isnan(res.loc['r', 'index_right'])
+        assert pd.isnull(res.loc['r', 'b'])
+
+    def test_k(self):
+        res = sjoin_nearest(self.points, self.lines, k=2)
+        assert list(res.index) == ['p', 'p', 'q', 'q', 'r', 'r']
+        assert list(res['index_right']) == [0, 1, 0, 1, 1, 0]
+
+    def test_right(self):
+        res = sjoin_nearest(self.points, self.lines, how='right')
+        assert list(res.index) == [0, 1]
+        assert res.index.name == 'index_right'
+        assert list(res['index_left']) == ['p', 'q']
+        assert res.geometry.geom_type.tolist() == ['LineString'] * 2